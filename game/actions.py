@@ -0,0 +1,46 @@
+"""
+Typed actions returned by agents.
+
+An action carries everything the engine needs to apply it: the face-up cards to take, the route to
+claim together with the exact cards to pay with, or a ticket draw. The engine only checks that the
+action is legal before applying it, so agents no longer have their choices re-derived by a scan.
+"""
+from dataclasses import dataclass
+from typing import Tuple, Union
+
+from game.utils import CardColor, Route
+
+CARDS_PER_DRAW = 2
+
+
+@dataclass(frozen=True)
+class DrawCards:
+    """
+    Draw two train cards. Each entry of face_up_indices takes that face-up card (counted in the display
+    as it is at the time of that draw, after earlier picks were replaced); the remaining draws are from
+    the deck. Indices that are out of range also draw from the deck.
+    """
+    face_up_indices: Tuple[int, ...] = ()
+
+
+@dataclass(frozen=True)
+class ClaimRoute:
+    """Claim a route, paying with exactly these cards."""
+    route: Route
+    cards: Tuple[CardColor, ...]
+
+
+@dataclass(frozen=True)
+class DrawTickets:
+    """Draw destination tickets and keep at least one of them."""
+
+
+Action = Union[DrawCards, ClaimRoute, DrawTickets]
+
+# Names of the actions in the string-based protocol agents used before typed actions
+ACTION_NAMES = {DrawCards: "draw_cards", ClaimRoute: "claim_route", DrawTickets: "draw_tickets"}
+
+
+def action_name(action: Action) -> str:
+    """Short name of an action, as in the old string protocol, e.g. for statistics."""
+    return ACTION_NAMES[type(action)]
@@ -1,6 +1,146 @@
-from typing import List, Dict, Set
-
-from game.utils import DestinationTicket, CardColor
+import time
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from game.actions import Action, ClaimRoute, DrawCards, DrawTickets
+from game.deadlines import WorkBudget
+from game.utils import DestinationTicket, CardColor, Route
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Boards with at least this many routes are evaluated with the NumPy kernel; on smaller ones its fixed
+# cost per call is more than the Python loop it replaces. NumPy is only imported once a board this large is played.
+VECTORIZE_MIN_ROUTES = 56
+PATH_ROUTE_BONUS = 40  # Added to the score of routes on the path of an incomplete ticket
+
+
+class DecisionContext:
+    """
+    Values derived from the game state for a single decision.
+    Each value is computed the first time an evaluator asks for it and reused afterwards,
+    so a context must not outlive the state it was created for.
+    """
+
+    def __init__(self, ai: "TicketToRideAI"):
+        self.ai = ai
+        self.player_state = ai.player_state
+        self.game_map = ai.game_map
+        self.player_id = ai.player_state["player_id"]
+        self._best_paths: Dict[Tuple[str, str], List[str]] = {}
+        self._completions: Dict[Tuple[str, str], float] = {}
+        self.best_route: Optional[Route] = None  # Route the claim evaluation scored highest
+        self.work = WorkBudget(ai.deadline)  # Counts ticket path searches, the expensive unit of work of a decision
+
+    @cached_property
+    def component_labels(self) -> Dict[str, str]:
+        """Connected component of each city on the player's network."""
+        return self.game_map.get_component_labels(self.player_id)
+
+    def is_connected(self, city1: str, city2: str) -> bool:
+        labels = self.component_labels
+        return city1 in labels and labels.get(city1) == labels.get(city2)
+
+    @cached_property
+    def incomplete_tickets(self) -> List[DestinationTicket]:
+        return [ticket for ticket in self.player_state["destination_tickets"]
+                if not self.is_connected(ticket.city1, ticket.city2)]
+
+    def best_path(self, ticket: DestinationTicket) -> List[str]:
+        key = (ticket.city1, ticket.city2)
+        if key not in self._best_paths:
+            started = time.monotonic()
+            self._best_paths[key] = self.ai._find_best_path(ticket.city1, ticket.city2)
+            self.work.record(started)
+        return self._best_paths[key]
+
+    def tickets_in_time(self):
+        """
+        Incomplete tickets to plan for: those whose path was already searched, and others only while
+        the search is expected to finish before the deadline. Without a deadline, all of them.
+        """
+        for ticket in self.incomplete_tickets:
+            if (ticket.city1, ticket.city2) in self._best_paths or self.work.has_time():
+                yield ticket
+
+    def ticket_completion(self, ticket: DestinationTicket) -> float:
+        key = (ticket.city1, ticket.city2)
+        if key not in self._completions:
+            self._completions[key] = self.ai._calculate_ticket_completion(ticket)
+        return self._completions[key]
+
+    @cached_property
+    def color_counts(self) -> Dict[CardColor, int]:
+        """Number of cards of each color in hand."""
+        return self.player_state["hand"].color_counts()
+
+    @cached_property
+    def most_common_color(self) -> Optional[CardColor]:
+        """The non-wild color we hold the most of, if any."""
+        return self.player_state["hand"].most_common_color()
+
+    @cached_property
+    def claimable_routes(self) -> Dict[Route, None]:
+        """Unclaimed routes we can afford with the current hand and have the trains for, in map order."""
+        legal_moves = self.player_state.get("legal_moves")
+        if legal_moves is not None:
+            return dict.fromkeys(legal_moves.routes(self.player_id))
+        # Player states that don't come from a GameState have no tracker, so check every route
+        hand = self.player_state["hand"]
+        trains = self.player_state["remaining_trains"]
+        return dict.fromkeys(route for route in self.game_map.unclaimed_routes
+                             if route.length <= trains and hand.can_afford(route))
+
+    @cached_property
+    def vectorized(self) -> bool:
+        """Whether routes are evaluated with the NumPy kernel, which only pays off on larger boards."""
+        return len(self.game_map.routes) >= VECTORIZE_MIN_ROUTES
+
+    @cached_property
+    def route_evaluation(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Mask of claimable routes and the off-path score of every route, in map order, in one vectorized pass."""
+        from game.kernels import RouteKernel, unclaimed_mask
+
+        kernel = RouteKernel.for_map(self.game_map)
+        legal_moves = self.player_state.get("legal_moves")
+        if legal_moves is not None:
+            hand = self.player_state["hand"]
+            return legal_moves.flags(self.player_id), kernel.scores(self.player_state["remaining_trains"], hand.size)
+        trains = self.player_state["remaining_trains"]
+        claimable, scores = kernel.evaluate(self.player_state["hand"].counts, trains, unclaimed_mask(self.game_map))
+        return claimable & (kernel.lengths <= trains), scores
+
+    def is_claimable(self, route: Route) -> bool:
+        if self.vectorized:
+            return bool(self.route_evaluation[0][self.game_map.route_index[route]])
+        return route in self.claimable_routes
+
+    def route_score(self, route: Route, is_path_route: bool) -> float:
+        if self.vectorized:
+            score = int(self.route_evaluation[1][self.game_map.route_index[route]])
+            return score + PATH_ROUTE_BONUS if is_path_route else score
+        return self.ai._score_route(route, is_path_route)
+
+    def best_claimable(self) -> Optional[Tuple[float, Route]]:
+        """Best off-path score of any claimable route and the first route with it, or None if we can't claim anything."""
+        if self.vectorized:
+            import numpy as np
+
+            claimable, scores = self.route_evaluation
+            if not claimable.any():
+                return None
+            index = int(np.where(claimable, scores, np.iinfo(scores.dtype).min).argmax())
+            return int(scores[index]), self.game_map.routes[index]
+        best = None
+        for route in self.claimable_routes:
+            score = self.ai._score_route(route, is_path_route=False)
+            if best is None or score > best[0]:
+                best = (score, route)
+        return best
+
+    @cached_property
+    def needed_colors(self) -> Set[CardColor]:
+        return self.ai._get_colors_needed_for_tickets()
 
 
 class TicketToRideAI:
@@ -8,21 +148,36 @@ class TicketToRideAI:
         self.player_state = player_state  # Hold reference to player's state
         self.game_map = game_map  # Add reference to the game map
         self.face_up_cards = []  # Add face_up_cards attribute
+        self._context: Optional[DecisionContext] = None  # Set while a decision is being made
+        self.deadline: Optional[float] = None  # time.monotonic() by which the next decision is due, if any
+        self.last_evaluations = 0  # Evaluations completed by the latest decision
+
+    def _get_context(self) -> DecisionContext:
+        """The context of the decision in progress, or a fresh one outside of a decision."""
+        return self._context if self._context is not None else DecisionContext(self)
 
     def set_face_up_cards(self, face_up_cards):
         """Update the face-up cards that the AI can see."""
         self.face_up_cards = face_up_cards
 
+    def set_deadline(self, deadline: Optional[float]):
+        """
+        Set the time.monotonic() time by which the next decision must be made, or None for no limit.
+        Decisions then only plan for as many tickets as there is time for, and use the best action found.
+        """
+        self.deadline = deadline
+
     def evaluate_game_state(self) -> float:
         """
         Evaluate current game state and return a score.
         Higher scores indicate better positions.
         """
         score = 0.0
+        context = self._get_context()
 
         # Factor 1: Progress on destination tickets (with penalty for incomplete)
         for ticket in self.player_state["destination_tickets"]:
-            completion_percentage = self._calculate_ticket_completion(ticket)
+            completion_percentage = context.ticket_completion(ticket)
             if completion_percentage >= 1.0:
                 score += ticket.points * 2  # Double bonus for completed tickets
             else:
@@ -47,11 +202,7 @@ class TicketToRideAI:
         Evaluate the potential of cards in hand.
         """
         score = 0.0
-        color_counts = {}
-
-        # Count cards by color
-        for card in self.player_state["hand"]:
-            color_counts[card] = color_counts.get(card, 0) + 1
+        color_counts = self._get_context().color_counts
 
         # Score sets of cards
         for color, count in color_counts.items():
@@ -74,36 +225,51 @@ class TicketToRideAI:
         Calculate how close we are to completing a destination ticket.
         Returns value between 0 and 1.
         """
-        # Build graph of claimed routes
-        graph = self._build_route_graph()
-
         # Check if cities are connected
-        if self._cities_connected(ticket.city1, ticket.city2, graph):
+        if self._get_context().is_connected(ticket.city1, ticket.city2):
             return 1.0
 
         # If not connected, estimate progress based on shortest path
-        distance = self._estimate_remaining_distance(ticket.city1, ticket.city2, graph)
+        distance = self._estimate_remaining_distance(ticket.city1, ticket.city2)
         max_possible_distance = 20  # approximate max distance in game
 
         return max(0, 1 - (distance / max_possible_distance))
 
-    def choose_action(self) -> str:
+    def choose_action(self) -> Action:
         """
         Decide the best action to take in current game state.
-        Returns one of: 'draw_cards', 'claim_route', 'draw_tickets'
+        Returns a DrawCards, ClaimRoute (with the best scoring route and the cards to pay with) or DrawTickets.
         """
-        # Calculate action scores
-        draw_score = self._evaluate_drawing_cards()
-        claim_score = self._evaluate_claiming_route()
-        ticket_score = self._evaluate_drawing_tickets()
-
-        # Return action with highest score
-        scores = {
-            'draw_cards': draw_score,
-            'claim_route': claim_score,
-            'draw_tickets': ticket_score
-        }
-        return max(scores.items(), key=lambda x: x[1])[0]
+        # Calculate action scores, sharing derived values between the evaluators
+        context = self._context = DecisionContext(self)
+        try:
+            draw_score = self._evaluate_drawing_cards()
+            claim_score = self._evaluate_claiming_route()
+            ticket_score = self._evaluate_drawing_tickets()
+
+            # Pick the action with the highest score
+            scores = {
+                'draw_cards': draw_score,
+                'claim_route': claim_score,
+                'draw_tickets': ticket_score
+            }
+            choice = max(scores.items(), key=lambda x: x[1])[0]
+            if choice == 'claim_route' and context.best_route is not None:
+                route = context.best_route
+                return ClaimRoute(route, tuple(self.player_state["hand"].payment(route)))
+            if choice == 'draw_tickets':
+                return DrawTickets()
+            return DrawCards(self._face_up_picks(context.needed_colors))
+        finally:
+            self.last_evaluations = context.work.completed
+            self._context = None
+
+    def _face_up_picks(self, needed_colors: Set[CardColor]) -> Tuple[int, ...]:
+        """Take the first face-up card of a color we need, if any; the other draw comes from the deck."""
+        for index, card in enumerate(self.face_up_cards):
+            if card in needed_colors:
+                return (index,)
+        return ()
 
     def choose_tickets_to_keep(self, tickets: List[DestinationTicket], min_keep: int) -> List[DestinationTicket]:
         """
@@ -119,7 +285,7 @@ class TicketToRideAI:
         score = 0.0
         
         # Find cards needed for completing destination tickets
-        needed_colors = self._get_colors_needed_for_tickets()
+        needed_colors = self._get_context().needed_colors
         
         # Check if any needed colors are in face-up cards
         if any(color in self.face_up_cards for color in needed_colors):
@@ -144,34 +310,32 @@ class TicketToRideAI:
         if self.player_state["remaining_trains"] <= 0:
             return -1000
 
+        context = self._get_context()
         best_route_score = -1000
-        urgency_bonus = 0
 
-        # Calculate completion status of all tickets
-        incomplete_tickets = []
-        for ticket in self.player_state["destination_tickets"]:
-            if not self._cities_connected(ticket.city1, ticket.city2, self._build_route_graph()):
-                incomplete_tickets.append(ticket)
-                urgency_bonus += ticket.points  # Add urgency based on potential points loss
+        # Add urgency based on potential points loss from incomplete tickets
+        incomplete_tickets = context.incomplete_tickets
+        urgency_bonus = sum(ticket.points for ticket in incomplete_tickets)
 
         # First, identify routes that would help complete destination tickets
-        for ticket in incomplete_tickets:
-            path = self._find_best_path(ticket.city1, ticket.city2)
+        for ticket in context.tickets_in_time():
+            path = context.best_path(ticket)
             if path:
                 for i in range(len(path) - 1):
                     city1, city2 = path[i], path[i + 1]
                     route = self._find_unclaimed_route(city1, city2)
-                    if route and self.game_map.has_enough_cards(self.player_state["hand"], route):
+                    if route and context.is_claimable(route):
                         # Increase score based on ticket points at risk
-                        route_score = self._score_route(route, is_path_route=True) + (ticket.points * 2)
-                        best_route_score = max(best_route_score, route_score)
+                        route_score = context.route_score(route, is_path_route=True) + (ticket.points * 2)
+                        if route_score > best_route_score:
+                            best_route_score = route_score
+                            context.best_route = route
 
         # If no routes found for tickets, consider any claimable route
         if best_route_score == -1000:
-            for route in self.game_map.routes:
-                if route.claimed_by is None and self.game_map.has_enough_cards(self.player_state["hand"], route):
-                    route_score = self._score_route(route, is_path_route=False)
-                    best_route_score = max(best_route_score, route_score)
+            best_claimable = context.best_claimable()
+            if best_claimable is not None and best_claimable[0] > best_route_score:
+                best_route_score, context.best_route = best_claimable
 
         # Add urgency bonus if we have incomplete tickets
         if incomplete_tickets:
@@ -190,10 +354,11 @@ class TicketToRideAI:
         Evaluate value of drawing new destination tickets.
         """
         score = 0.0
+        context = self._get_context()
 
         # Very negative score if we have incomplete tickets
         incomplete_tickets = sum(1 for ticket in self.player_state["destination_tickets"]
-                               if self._calculate_ticket_completion(ticket) < 0.5)
+                               if context.ticket_completion(ticket) < 0.5)
         score -= incomplete_tickets * 15  # Increased penalty
 
         # Only valuable very early in game with no incomplete tickets
@@ -204,163 +369,48 @@ class TicketToRideAI:
 
         return score
 
-    def _build_route_graph(self) -> Dict[str, Set[str]]:
-        """
-        Build graph representation of claimed routes.
-        """
-        graph = {}
-        for route in self.player_state["claimed_routes"]:
-            if route.city1 not in graph:
-                graph[route.city1] = set()
-            if route.city2 not in graph:
-                graph[route.city2] = set()
-
-            graph[route.city1].add(route.city2)
-            graph[route.city2].add(route.city1)
-
-        return graph
-
-    def _cities_connected(self, city1: str, city2: str, graph: Dict[str, Set[str]]) -> bool:
-        """
-        Check if two cities are connected in the graph using BFS.
-        """
-        if city1 not in graph or city2 not in graph:
-            return False
-
-        visited = set()
-        queue = [city1]
-
-        while queue:
-            city = queue.pop(0)
-            if city == city2:
-                return True
-
-            if city in visited:
-                continue
-
-            visited.add(city)
-            queue.extend(graph[city] - visited)
-
-        return False
-
-    def _estimate_remaining_distance(self, city1: str, city2: str, graph: Dict[str, Set[str]]) -> int:
-        """Estimate remaining distance needed to connect two cities using Dijkstra's algorithm."""
-        if city1 == city2:
-            return 0
-
-        distances = {city: float('infinity') for city in self.game_map.cities.keys()}
-        distances[city1] = 0
-        unvisited = set(self.game_map.cities.keys())
-
-        while unvisited:
-            # Get closest unvisited city
-            current = min(unvisited, key=lambda city: distances[city])
-            if current == city2:
-                return int(distances[city2])
-
-            if distances[current] == float('infinity'):
-                break
-
-            unvisited.remove(current)
-
-            # Check all routes from current city
-            for route in self.game_map.routes:
-                if route.city1 == current and route.city2 in unvisited:
-                    new_dist = distances[current] + route.length
-                    if new_dist < distances[route.city2]:
-                        distances[route.city2] = new_dist
-                elif route.city2 == current and route.city1 in unvisited:
-                    new_dist = distances[current] + route.length
-                    if new_dist < distances[route.city1]:
-                        distances[route.city1] = new_dist
-
-        return int(distances[city2]) if distances[city2] != float('infinity') else 10
+    def _estimate_remaining_distance(self, city1: str, city2: str) -> int:
+        """Estimate remaining distance needed to connect two cities using the shared shortest-path service."""
+        distance = self.game_map.shortest_paths.distance(city1, city2)
+        return distance if distance is not None else 10
 
     def _get_colors_needed_for_tickets(self) -> Set[CardColor]:
         """Identify colors needed to complete destination tickets."""
         needed_colors = set()
-        
-        for ticket in self.player_state["destination_tickets"]:
-            if not self._cities_connected(ticket.city1, ticket.city2, self._build_route_graph()):
-                path = self._find_best_path(ticket.city1, ticket.city2)
-                if path:
-                    for i in range(len(path) - 1):
-                        route = self._find_unclaimed_route(path[i], path[i + 1])
-                        if route:
-                            if route.color != CardColor.GREY:
-                                needed_colors.add(route.color)
-                            else:
-                                # For grey routes, add any color we have most of
-                                color_counts = {}
-                                for card in self.player_state["hand"]:
-                                    if card != CardColor.WILD:
-                                        color_counts[card] = color_counts.get(card, 0) + 1
-                                if color_counts:
-                                    needed_colors.add(max(color_counts.items(), key=lambda x: x[1])[0])
+        context = self._get_context()
+
+        for ticket in context.tickets_in_time():
+            path = context.best_path(ticket)
+            if path:
+                for i in range(len(path) - 1):
+                    route = self._find_unclaimed_route(path[i], path[i + 1])
+                    if route:
+                        if route.color != CardColor.GREY:
+                            needed_colors.add(route.color)
+                        elif context.most_common_color is not None:
+                            # For grey routes, add any color we have most of
+                            needed_colors.add(context.most_common_color)
 
         return needed_colors
 
     def _find_best_path(self, city1: str, city2: str) -> List[str]:
-        """Find the best path between two cities using Dijkstra's algorithm."""
-        distances = {city: float('infinity') for city in self.game_map.cities}
-        distances[city1] = 0
-        previous = {city: None for city in self.game_map.cities}
-        unvisited = set(self.game_map.cities)
-
-        while unvisited:
-            # Fix: Use city parameter instead of current in the lambda
-            current = min(unvisited, key=lambda city: distances[city])
-            if current == city2:
-                break
-
-            if distances[current] == float('infinity'):
-                break
-
-            unvisited.remove(current)
-
-            for route in self.game_map.routes:
-                if route.claimed_by is not None and route.claimed_by != self.player_state["player_id"]:
-                    continue
-
-                next_city = None
-                if route.city1 == current and route.city2 in unvisited:
-                    next_city = route.city2
-                elif route.city2 == current and route.city1 in unvisited:
-                    next_city = route.city1
-
-                if next_city:
-                    new_dist = distances[current] + route.length
-                    if new_dist < distances[next_city]:
-                        distances[next_city] = new_dist
-                        previous[next_city] = current
-
-        if distances[city2] == float('infinity'):
-            return []
-
-        # Reconstruct path
-        path = []
-        current = city2
-        while current is not None:
-            path.append(current)
-            current = previous[current]
-        return list(reversed(path))
+        """Find the best path between two cities, avoiding routes claimed by other players."""
+        return self.game_map.shortest_paths.path(city1, city2, self.player_state["player_id"])
 
     def _find_unclaimed_route(self, city1: str, city2: str):
         """Find an unclaimed route between two cities."""
-        for route in self.game_map.routes:
+        for route in self.game_map.get_routes_between(city1, city2):
             if route.claimed_by is None:
-                if (route.city1 == city1 and route.city2 == city2) or \
-                   (route.city1 == city2 and route.city2 == city1):
-                    return route
+                return route
         return None
 
     def _score_route(self, route, is_path_route: bool) -> float:
-        """Score a route based on its strategic value."""
+        """Score a route based on its strategic value. RouteKernel.scores applies the same rules to every route."""
         score = self.game_map.calculate_route_points(route) * 2
 
         # Higher bonus for routes that complete destination tickets
         if is_path_route:
-            score += 40  # Increased from 30
+            score += PATH_ROUTE_BONUS
 
         # Smaller penalty for longer routes
         if self.player_state["remaining_trains"] < 10:
@@ -0,0 +1,80 @@
+import importlib
+import weakref
+from typing import Dict, List
+
+# Rendering backends by name, as "module:class" so a backend's module, and whatever it needs from the
+# rendering stack, is only imported the first time that backend is asked for
+BACKENDS: Dict[str, str] = {
+    "svg": "game.backends:SvgBackend",
+    "png": "game.raster:PngBackend",
+    "null": "game.backends:NullBackend",
+}
+_instances: Dict[str, "RenderBackend"] = {}
+
+
+class RenderBackend:
+    """Turns a frame of the game, the board plus the players' hands, into some output format."""
+    name = ""
+    extension = ""  # File extension for written frames, without the dot
+    binary = False  # Whether render returns bytes rather than text
+
+    def render(self, game_map, width: int = 800, height: int = 600, turn_number: int = None,
+               player_hands=None, current_player: int = None, face_up_cards=None):
+        raise NotImplementedError
+
+    def write(self, filename: str, game_map, **kwargs):
+        """Render a frame to a file."""
+        output = self.render(game_map, **kwargs)
+        with open(filename, "wb" if self.binary else "w") as f:
+            f.write(output)
+
+
+class NullBackend(RenderBackend):
+    """Renders nothing, for headless runs that go through rendering code paths."""
+    name = "null"
+
+    def render(self, game_map, width: int = 800, height: int = 600, turn_number: int = None,
+               player_hands=None, current_player: int = None, face_up_cards=None):
+        return None
+
+    def write(self, filename: str, game_map, **kwargs):
+        pass
+
+
+class SvgBackend(RenderBackend):
+    """SVG text from the layered renderer, which is kept per map so its static layer is reused."""
+    name = "svg"
+    extension = "svg"
+
+    def __init__(self):
+        from game.render import SvgRenderer
+        self._renderer_class = SvgRenderer
+        self._renderers = weakref.WeakKeyDictionary()
+
+    def render(self, game_map, width: int = 800, height: int = 600, turn_number: int = None,
+               player_hands=None, current_player: int = None, face_up_cards=None) -> str:
+        renderer = self._renderers.get(game_map)
+        if renderer is None:
+            renderer = self._renderers[game_map] = self._renderer_class(game_map)
+        return renderer.render(width, height, turn_number, player_hands, current_player, face_up_cards)
+
+
+def register_backend(name: str, target: str):
+    """Register a backend class, given as "module:class", under a name."""
+    BACKENDS[name] = target
+    _instances.pop(name, None)
+
+
+def available_backends() -> List[str]:
+    return list(BACKENDS)
+
+
+def get_backend(name: str = "svg") -> RenderBackend:
+    """The shared instance of a backend, importing its module the first time it is asked for."""
+    backend = _instances.get(name)
+    if backend is None:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown rendering backend {name!r}, expected one of {', '.join(BACKENDS)}")
+        module_name, _, class_name = BACKENDS[name].partition(":")
+        backend = _instances[name] = getattr(importlib.import_module(module_name), class_name)()
+    return backend
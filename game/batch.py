@@ -0,0 +1,258 @@
+"""
+NumPy batch engine that plays many games in lockstep.
+
+Every game in the batch uses the same map and the same rules as GameState/TicketToRideMap,
+but the state of all games is stored in arrays so each turn is advanced for the whole batch
+with a handful of vectorized operations:
+
+- route ownership: int8 [games, routes], -1 while unclaimed
+- hands: int16 [games, players, colors] card counts, indexed like game.hand.CARD_COLORS
+- deck: int8 [games, cards] shuffled card color indices, drawn from the end like train_deck
+  after dealing the face-up display, which batch policies never draw from
+- trains, points: [games, players]
+- tickets: bool [games, players, tickets] destination tickets held
+
+Agents are replaced by vectorized policies that pick one action per game: a route index to
+claim, or DRAW_CARDS. As in play_turn, a claim that turns out to be illegal draws a single card.
+Since cards only come from the deck, a game ends when its deck runs out, at the turn limit or
+after the final round.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+from game.hand import CARD_COLORS, COLOR_INDEX, WILD_INDEX
+from game.kernels import GREY_ROUTE, RouteKernel
+from game.map import TicketToRideMap
+from game.state import (FACE_UP_CARDS, FINAL_ROUND_TRAINS, INITIAL_TICKETS, INITIAL_TICKETS_KEPT, STARTING_CARDS,
+                        STARTING_TRAINS, TRAIN_DECK_DISTRIBUTION)
+
+DRAW_CARDS = -1  # Action for drawing two cards from the deck
+
+NUM_COLORS = len(CARD_COLORS)
+
+
+class BatchGame:
+    """N independent games of the same map and player count, advanced together one turn at a time."""
+
+    def __init__(self, num_games: int, num_players: int = 2, game_map: Optional[TicketToRideMap] = None,
+                 seed: Optional[int] = None, max_turns: int = 80):
+        game_map = game_map if game_map is not None else TicketToRideMap()
+        self.map = game_map
+        self.num_games = num_games
+        self.num_players = num_players
+        self.max_turns = max_turns
+        self.rng = np.random.default_rng(seed)
+        self._games = np.arange(num_games)
+
+        # Static route and ticket tables, the route ones shared with the map's vectorized kernel
+        self.kernel = RouteKernel.for_map(game_map)
+        self.route_lengths = self.kernel.lengths.astype(np.int16)
+        self.route_points = self.kernel.points.astype(np.int16)
+        self.route_colors = self.kernel.colors  # GREY_ROUTE for grey routes
+
+        city_index = {city: i for i, city in enumerate(game_map.cities)}
+        self.num_cities = len(city_index)
+        self.route_cities = np.array([(city_index[route.city1], city_index[route.city2])
+                                      for route in game_map.routes], dtype=np.int32).reshape(-1, 2)
+        self.ticket_cities = np.array([(city_index[ticket.city1], city_index[ticket.city2])
+                                       for ticket in game_map.destination_tickets], dtype=np.int32).reshape(-1, 2)
+        self.ticket_points = np.array([ticket.points for ticket in game_map.destination_tickets], dtype=np.int32)
+
+        # Dynamic state
+        num_routes = len(game_map.routes)
+        self.owner = np.full((num_games, num_routes), -1, dtype=np.int8)
+        self.hands = np.zeros((num_games, num_players, NUM_COLORS), dtype=np.int16)
+        self.trains = np.full((num_games, num_players), STARTING_TRAINS, dtype=np.int16)
+        self.points = np.zeros((num_games, num_players), dtype=np.int32)
+        self.tickets = np.zeros((num_games, num_players, len(self.ticket_points)), dtype=bool)
+        self.current_player = np.zeros(num_games, dtype=np.int8)
+        self.turn_number = np.zeros(num_games, dtype=np.int32)
+        self.final_round = np.zeros(num_games, dtype=bool)
+        self.last_turn_player = np.full(num_games, -1, dtype=np.int8)
+        self.done = np.zeros(num_games, dtype=bool)
+
+        deck = np.repeat([COLOR_INDEX[color] for color in TRAIN_DECK_DISTRIBUTION],
+                         list(TRAIN_DECK_DISTRIBUTION.values())).astype(np.int8)
+        self.deck = self.rng.permuted(np.tile(deck, (num_games, 1)), axis=1)
+        self.deck_size = np.full(num_games, len(deck), dtype=np.int32)
+
+        self._deal()
+
+    def _deal(self):
+        """Deal starting hands and destination tickets, as setup_game does."""
+        # The face-up display is dealt off the deck as in GameState, but nothing draws from it
+        self.deck_size -= FACE_UP_CARDS
+
+        everyone = np.ones(self.num_games, dtype=bool)
+        for player in range(self.num_players):
+            for _ in range(STARTING_CARDS):
+                self._draw_card(everyone, np.full(self.num_games, player))
+
+        # Each player is offered tickets from a shuffled pile and keeps the highest scoring ones
+        order = self.rng.random((self.num_games, len(self.ticket_points))).argsort(axis=1)
+        for player in range(self.num_players):
+            offered = order[:, player * INITIAL_TICKETS:(player + 1) * INITIAL_TICKETS]
+            ranking = np.argsort(-self.ticket_points[offered], axis=1, kind="stable")
+            kept = np.take_along_axis(offered, ranking[:, :INITIAL_TICKETS_KEPT], axis=1)
+            self.tickets[self._games[:, None], player, kept] = True
+
+    def _draw_card(self, mask: np.ndarray, players: np.ndarray):
+        """Draw the top deck card into the given player's hand for every game in mask that has cards left."""
+        mask = mask & (self.deck_size > 0)
+        games = self._games[mask]
+        cards = self.deck[games, self.deck_size[games] - 1]
+        self.hands[games, players[mask], cards] += 1
+        self.deck_size[games] -= 1
+
+    def current_hands(self) -> np.ndarray:
+        """Hand of the player to move in each game, [games, colors]."""
+        return self.hands[self._games, self.current_player]
+
+    def claimable_mask(self, hands: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Routes each game's current player could claim, [games, routes].
+        Applies the same rules as Hand.can_afford and GameState.claim_route to every route and game at once.
+        """
+        if hands is None:
+            hands = self.current_hands()
+        trains = self.trains[self._games, self.current_player]
+        return self.kernel.affordable(hands) & (self.owner == -1) & (self.route_lengths <= trains[:, None])
+
+    def _pay(self, games: np.ndarray, routes: np.ndarray):
+        """Remove the cards for claiming routes[i] in games[i], using the same choice of cards as Hand.spend."""
+        players = self.current_player[games]
+        hands = self.hands[games, players].astype(np.int32)
+        lengths = self.route_lengths[routes].astype(np.int32)
+        colors = self.route_colors[routes].astype(np.int64)
+        rows = np.arange(len(games))
+        payment = np.zeros_like(hands)
+
+        # Colored and grey routes: matching cards (the most held color for grey routes), then wilds
+        colored = colors != WILD_INDEX
+        chosen = np.where(colors == GREY_ROUTE, hands[:, :WILD_INDEX].argmax(axis=1), colors)
+        matching = np.minimum(hands[rows, np.where(colored, chosen, 0)], lengths)
+        payment[rows[colored], chosen[colored]] = matching[colored]
+        payment[rows[colored], WILD_INDEX] = (lengths - matching)[colored]
+
+        # Wild routes: wild cards first, then other colors in color order
+        wild_route = ~colored
+        wilds = np.minimum(hands[:, WILD_INDEX], lengths)
+        remaining = (lengths - wilds)[:, None]
+        before = np.cumsum(hands[:, :WILD_INDEX], axis=1) - hands[:, :WILD_INDEX]
+        others = np.clip(remaining - before, 0, hands[:, :WILD_INDEX])
+        payment[wild_route, :WILD_INDEX] = others[wild_route]
+        payment[wild_route, WILD_INDEX] = wilds[wild_route]
+
+        self.hands[games, players] -= payment.astype(self.hands.dtype)
+
+    def step(self, actions: np.ndarray):
+        """Apply one action per game (a route index or DRAW_CARDS) and advance every unfinished game by a turn."""
+        actions = np.asarray(actions)
+        active = ~self.done
+        players = self.current_player.astype(np.int64)
+
+        claiming = active & (actions >= 0)
+        routes = np.where(claiming, actions, 0)
+        legal = claiming & self.claimable_mask()[self._games, routes]
+
+        games = self._games[legal]
+        if len(games):
+            claimed = routes[legal]
+            self._pay(games, claimed)
+            self.owner[games, claimed] = players[legal]
+            self.points[games, players[legal]] += self.route_points[claimed]
+            self.trains[games, players[legal]] -= self.route_lengths[claimed]
+
+        # Drawing takes two cards; a claim that could not be made falls back to a single card
+        drawing = active & ~claiming
+        self._draw_card(drawing, players)
+        self._draw_card(drawing | (claiming & ~legal), players)
+
+        # Endgame condition for the player who just moved
+        trains_left = self.trains[self._games, players]
+        starts_final = active & ~self.final_round & (trains_left <= FINAL_ROUND_TRAINS)
+        self.final_round |= starts_final
+        self.last_turn_player[starts_final] = players[starts_final]
+
+        self.turn_number[active] += 1
+        self.current_player[active] = (players[active] + 1) % self.num_players
+        self.done |= active & (
+            (self.final_round & (self.current_player == self.last_turn_player))
+            | (self.turn_number >= self.max_turns)
+            | (self.deck_size == 0)
+        )
+
+    def connected_labels(self) -> np.ndarray:
+        """
+        Connected component label of every city in every player's network, [games, players, cities].
+        Labels start as city indices and the smaller label is propagated along owned routes
+        until nothing changes, so two cities are connected exactly when their labels match.
+        """
+        num_networks = self.num_games * self.num_players
+        labels = np.tile(np.arange(self.num_cities, dtype=np.int32), (num_networks, 1))
+        owned = (self.owner[:, None, :] == np.arange(self.num_players)[None, :, None]).reshape(num_networks, -1)
+        city1, city2 = self.route_cities[None, :, 0], self.route_cities[None, :, 1]
+        rows = np.arange(num_networks)[:, None]
+
+        while True:
+            merged = np.where(owned, np.minimum(labels[:, city1[0]], labels[:, city2[0]]), self.num_cities)
+            updated = labels.copy()
+            np.minimum.at(updated, (rows, city1), merged)
+            np.minimum.at(updated, (rows, city2), merged)
+            # Pointer jumping: a city takes the label of its label, which shortens long chains
+            updated = np.take_along_axis(updated, updated, axis=1)
+            if np.array_equal(updated, labels):
+                return labels.reshape(self.num_games, self.num_players, self.num_cities)
+            labels = updated
+
+    def completed_tickets(self) -> np.ndarray:
+        """Whether each ticket would count as completed for each player, [games, players, tickets]."""
+        labels = self.connected_labels()
+        return labels[..., self.ticket_cities[:, 0]] == labels[..., self.ticket_cities[:, 1]]
+
+    def final_scores(self) -> np.ndarray:
+        """Route points plus completed tickets minus incomplete ones, [games, players]."""
+        ticket_values = np.where(self.completed_tickets(), self.ticket_points, -self.ticket_points)
+        return self.points + (ticket_values * self.tickets).sum(axis=2)
+
+    def play(self, policies: Sequence["BatchPolicy"]) -> np.ndarray:
+        """Play every game to the end with one policy per seat and return the final scores."""
+        while not self.done.all():
+            actions = np.full(self.num_games, DRAW_CARDS, dtype=np.int64)
+            for player, policy in enumerate(policies):
+                seated = self.current_player == player
+                if seated.any():
+                    actions[seated] = policy(self)[seated]
+            self.step(actions)
+        return self.final_scores()
+
+
+class BatchPolicy:
+    """A vectorized policy returns one action per game in the batch for the players to move."""
+
+    def __call__(self, batch: BatchGame) -> np.ndarray:
+        raise NotImplementedError
+
+
+class GreedyRoutePolicy(BatchPolicy):
+    """Claim the affordable route worth the most points, or draw cards if nothing is affordable."""
+
+    def __call__(self, batch: BatchGame) -> np.ndarray:
+        claimable = batch.claimable_mask()
+        values = np.where(claimable, batch.route_points[None, :], -1)
+        return np.where(claimable.any(axis=1), values.argmax(axis=1), DRAW_CARDS)
+
+
+class RandomPolicy(BatchPolicy):
+    """Claim a random affordable route with probability claim_probability, otherwise draw cards."""
+
+    def __init__(self, claim_probability: float = 0.5, seed: Optional[int] = None):
+        self.claim_probability = claim_probability
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, batch: BatchGame) -> np.ndarray:
+        claimable = batch.claimable_mask()
+        noise = np.where(claimable, self.rng.random(claimable.shape), -1.0)
+        wants_claim = self.rng.random(batch.num_games) < self.claim_probability
+        return np.where(claimable.any(axis=1) & wants_claim, noise.argmax(axis=1), DRAW_CARDS)
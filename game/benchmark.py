@@ -0,0 +1,320 @@
+import argparse
+import itertools
+import json
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game.agent import TicketToRideAI
+from game.hand import Hand, CARD_COLORS
+from game.map import TicketToRideMap
+from game.mapgen import generate_map
+from game.paths import ShortestPaths
+from game.replay import render_game_svg
+from game.simulation import play_out, setup_game, simulate_game
+from game.state import GameState
+
+RESULTS_VERSION = 1
+DEFAULT_THRESHOLD = 0.10  # Slowdown relative to the baseline that counts as a regression
+BENCHMARK_SEED = 1234
+# Turns at which the agent's decisions are timed
+GAME_PHASES = {"early": 4, "mid": 30, "late": 56}
+# Numbers of cities of the generated boards in the scaling benchmark
+DEFAULT_SCALING_SIZES = [19, 50, 100, 200, 400]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    seconds_per_op: float  # Best of all repeats, like timeit
+    ops_per_second: float
+    number: int  # Operations per repeat
+    repeats: int
+
+
+def _measure(name: str, func: Callable[[], None], number: int, repeats: int) -> BenchmarkResult:
+    """Time number calls of func, repeats times, and keep the fastest run."""
+    func()  # Warm up caches and lazily built state before timing
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    per_op = best / number
+    return BenchmarkResult(name, per_op, 1 / per_op if per_op else float("inf"), number, repeats)
+
+
+@dataclass
+class ScalingResult:
+    cities: int
+    routes: int
+    choose_action_seconds: float  # One mid-game decision, best of all repeats
+    games_per_second: float
+
+
+def _per_call(result: BenchmarkResult, calls: int) -> BenchmarkResult:
+    """Turn a result for a batch of calls into the cost of a single call."""
+    per_op = result.seconds_per_op / calls
+    return BenchmarkResult(result.name, per_op, 1 / per_op, result.number * calls, result.repeats)
+
+
+def _random_hands(rng: random.Random, count: int) -> List[Hand]:
+    return [Hand(rng.choice(CARD_COLORS) for _ in range(rng.randint(0, 12))) for _ in range(count)]
+
+
+def _game_at_turn(seed: int, turn: int, num_players: int = 2,
+                  map_factory: Callable[[], TicketToRideMap] = TicketToRideMap) -> Tuple[GameState, int]:
+    """A game played by the default agents up to the given turn, and the player to move next."""
+    game_map = map_factory()
+    game = GameState(game_map, num_players, rng=random.Random(seed))
+    for i in range(num_players):
+        game.players[i]['ai_agent'] = TicketToRideAI(game.players[i], game_map)
+    setup_game(game)
+
+    # The engine's own loop, with the turn as the turn limit
+    current_player = play_out(game, 0, turn)
+    if current_player is None:
+        raise ValueError(f"Game {seed} ended before turn {turn}")
+    return game, current_player
+
+
+def bench_card_checks(repeats: int) -> List[BenchmarkResult]:
+    rng = random.Random(BENCHMARK_SEED)
+    game_map = TicketToRideMap()
+    hands = _random_hands(rng, 200)
+    routes = game_map.routes
+
+    def has_enough_cards():
+        for hand in hands:
+            for route in routes:
+                game_map.has_enough_cards(hand, route)
+
+    def spend_cards():
+        for hand in hands:
+            for route in routes:
+                game_map.spend_cards(hand.copy(), route)
+
+    calls = len(hands) * len(routes)
+    results = [_per_call(_measure("has_enough_cards", has_enough_cards, 5, repeats), calls),
+               _per_call(_measure("spend_cards", spend_cards, 2, repeats), calls)]
+
+    # Claimable routes of every player in the middle of a game, from the tracker and by checking every route
+    game, _ = _game_at_turn(BENCHMARK_SEED, GAME_PHASES["mid"])
+
+    def claimable_routes():
+        for player_id in game.players:
+            game.claimable_routes(player_id)
+
+    def claimable_scan():
+        for player in game.players.values():
+            [route for route in game.map.unclaimed_routes
+             if route.length <= player["remaining_trains"] and game.map.has_enough_cards(player["hand"], route)]
+
+    return results + [_measure("claimable_routes", claimable_routes, 2000, repeats),
+                      _measure("claimable_scan", claimable_scan, 2000, repeats)]
+
+
+def bench_choose_action(repeats: int) -> List[BenchmarkResult]:
+    results = []
+    for phase, turn in GAME_PHASES.items():
+        game, current_player = _game_at_turn(BENCHMARK_SEED, turn)
+        ai = game.players[current_player]['ai_agent']
+        ai.set_face_up_cards(game.face_up_cards)
+        results.append(_measure(f"choose_action_{phase}", ai.choose_action, 200, repeats))
+    return results
+
+
+def bench_graph_queries(repeats: int) -> List[BenchmarkResult]:
+    game, current_player = _game_at_turn(BENCHMARK_SEED, GAME_PHASES["mid"])
+    game_map = game.map
+    ai = game.players[current_player]['ai_agent']
+    pairs = [(ticket.city1, ticket.city2) for ticket in game_map.destination_tickets]
+
+    def are_cities_connected():
+        for player_id in game.players:
+            for city1, city2 in pairs:
+                game_map.are_cities_connected(player_id, city1, city2)
+
+    def find_best_path():
+        # Start from an empty cache, as every decision after a claim does
+        game_map.shortest_paths = ShortestPaths(game_map)
+        for city1, city2 in pairs:
+            ai._find_best_path(city1, city2)
+
+    results = [
+        _per_call(_measure("are_cities_connected", are_cities_connected, 200, repeats),
+                  len(pairs) * len(game.players)),
+        _per_call(_measure("find_best_path_cold", find_best_path, 50, repeats), len(pairs)),
+    ]
+    game_map.shortest_paths = ShortestPaths(game_map)
+    return results
+
+
+def bench_render(repeats: int) -> List[BenchmarkResult]:
+    game, current_player = _game_at_turn(BENCHMARK_SEED, GAME_PHASES["late"])
+    return [_measure("render_svg", lambda: render_game_svg(game, current_player), 50, repeats)]
+
+
+def bench_full_games(repeats: int) -> List[BenchmarkResult]:
+    # Every repeat plays the same games
+    seeds = itertools.cycle(range(BENCHMARK_SEED, BENCHMARK_SEED + 10))
+    return [_measure("headless_game", lambda: simulate_game(next(seeds)), 10, repeats)]
+
+
+BENCHMARKS: Dict[str, Callable[[int], List[BenchmarkResult]]] = {
+    "card_checks": bench_card_checks,
+    "choose_action": bench_choose_action,
+    "graph_queries": bench_graph_queries,
+    "render": bench_render,
+    "full_games": bench_full_games,
+}
+
+
+def run_benchmarks(groups: Optional[List[str]] = None, repeats: int = 5) -> Dict[str, BenchmarkResult]:
+    """Run the given benchmark groups, or all of them, and return the results by benchmark name."""
+    results = {}
+    for group in groups or BENCHMARKS:
+        for result in BENCHMARKS[group](repeats):
+            results[result.name] = result
+    return results
+
+
+def run_scaling(sizes: List[int] = DEFAULT_SCALING_SIZES, repeats: int = 3,
+                games: int = 3) -> List[ScalingResult]:
+    """
+    Time mid-game decisions and full games on generated boards of increasing size.
+    Each board is generated once from a fixed seed, and every game plays on a fresh fork of it.
+    """
+    results = []
+    for num_cities in sizes:
+        board = generate_map(num_cities, seed=BENCHMARK_SEED)
+        game, current_player = _game_at_turn(BENCHMARK_SEED, GAME_PHASES["mid"], map_factory=board.fork)
+        ai = game.players[current_player]['ai_agent']
+        ai.set_face_up_cards(game.face_up_cards)
+        decision = _measure(f"choose_action_{num_cities}", ai.choose_action, 20, repeats)
+
+        seeds = itertools.cycle(range(BENCHMARK_SEED, BENCHMARK_SEED + games))
+        full_game = _measure(f"headless_game_{num_cities}",
+                             lambda: simulate_game(next(seeds), map_factory=board.fork), games, repeats)
+        results.append(ScalingResult(num_cities, len(board.routes), decision.seconds_per_op,
+                                     full_game.ops_per_second))
+    return results
+
+
+def plot_scaling(results: List[ScalingResult], filename: str):
+    """Plot decision latency and games per second against the number of cities. Needs matplotlib."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    cities = [result.cities for result in results]
+    figure, (latency, throughput) = plt.subplots(1, 2, figsize=(10, 4))
+    latency.plot(cities, [result.choose_action_seconds * 1e3 for result in results], marker="o")
+    latency.set(xlabel="cities", ylabel="ms per decision", title="Mid-game decision latency")
+    throughput.plot(cities, [result.games_per_second for result in results], marker="o")
+    throughput.set(xlabel="cities", ylabel="games per second", title="Headless games")
+    for axes in (latency, throughput):
+        axes.set_xscale("log")
+        axes.set_yscale("log")
+        axes.grid(True, which="both", alpha=0.3)
+    figure.tight_layout()
+    figure.savefig(filename)
+    plt.close(figure)
+
+
+def print_scaling(results: List[ScalingResult]):
+    print(f"{'cities':>8}{'routes':>8}{'decision':>14}{'games/s':>12}")
+    for result in results:
+        print(f"{result.cities:>8}{result.routes:>8}{result.choose_action_seconds * 1e3:>12.3f}ms"
+              f"{result.games_per_second:>12.2f}")
+
+
+def results_to_json(results: Dict[str, BenchmarkResult]) -> dict:
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": {name: asdict(result) for name, result in results.items()},
+    }
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float]]:
+    """
+    Compare results against a baseline, both as produced by results_to_json.
+    Returns (name, slowdown ratio) for every benchmark more than threshold slower than the baseline.
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            continue
+        ratio = result["seconds_per_op"] / reference["seconds_per_op"]
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def print_results(results: dict, baseline: Optional[dict] = None):
+    print(f"{'benchmark':<24}{'time/op':>14}{'ops/s':>14}{'vs baseline':>14}")
+    for name, result in results["results"].items():
+        line = f"{name:<24}{result['seconds_per_op'] * 1e6:>12.2f}us{result['ops_per_second']:>14.1f}"
+        if baseline and name in baseline["results"]:
+            line += f"{result['seconds_per_op'] / baseline['results'][name]['seconds_per_op']:>13.2f}x"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the engine's hot paths and full games.")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against results stored in this JSON file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Slowdown that counts as a regression, 0.1 meaning 10%% slower")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing runs per benchmark, the fastest is kept")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Benchmark groups to run")
+    parser.add_argument("--scaling", nargs="*", type=int, metavar="CITIES",
+                        help="Instead, time decisions and games on generated boards of these sizes")
+    parser.add_argument("--plot", help="With --scaling, plot the results to this image file (needs matplotlib)")
+    args = parser.parse_args(argv)
+
+    if args.scaling is not None:
+        scaling = run_scaling(args.scaling or DEFAULT_SCALING_SIZES, args.repeats)
+        print_scaling(scaling)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump({"version": RESULTS_VERSION, "python": platform.python_version(),
+                           "platform": platform.platform(),
+                           "scaling": [asdict(result) for result in scaling]}, f, indent=2)
+        if args.plot:
+            try:
+                plot_scaling(scaling, args.plot)
+            except ImportError:
+                print("Plotting needs matplotlib: pip install matplotlib")
+                return 1
+        return 0
+
+    results = results_to_json(run_benchmarks(args.only, args.repeats))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline:
+        regressions = find_regressions(results, baseline, args.threshold)
+        for name, ratio in regressions:
+            print(f"Regression: {name} is {ratio:.2f}x the baseline time")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
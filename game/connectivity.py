@@ -0,0 +1,48 @@
+from typing import Dict
+
+
+class UnionFind:
+    """
+    Disjoint sets of cities, used to track which cities a player's routes connect.
+    Uses path halving and union by size, so lookups are effectively constant time.
+    """
+
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+        self.size: Dict[str, int] = {}
+
+    def __contains__(self, city: str) -> bool:
+        return city in self.parent
+
+    def find(self, city: str) -> str:
+        """Return the representative city of the component containing city."""
+        parent = self.parent
+        if city not in parent:
+            parent[city] = city
+            self.size[city] = 1
+            return city
+
+        while parent[city] != city:
+            parent[city] = parent[parent[city]]
+            city = parent[city]
+        return city
+
+    def union(self, city1: str, city2: str):
+        """Merge the components containing the two cities."""
+        root1, root2 = self.find(city1), self.find(city2)
+        if root1 == root2:
+            return
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+
+    def connected(self, city1: str, city2: str) -> bool:
+        """Check if both cities are in the structure and belong to the same component."""
+        if city1 not in self.parent or city2 not in self.parent:
+            return False
+        return self.find(city1) == self.find(city2)
+
+    def labels(self) -> Dict[str, str]:
+        """Map every known city to the representative city of its component."""
+        return {city: self.find(city) for city in self.parent}
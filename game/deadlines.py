@@ -0,0 +1,89 @@
+"""
+Per-move time budgets.
+
+With a budget, the engine gives every decision a deadline on the time.monotonic() clock. Agents with a
+set_deadline method are told it before they decide and are expected to return the best action they
+have found when time runs out, reporting how many evaluations they completed in last_evaluations.
+
+The budget is cooperative: decisions run in the engine's thread and are never interrupted, so only
+agents that watch their deadline are bounded by it. The engine checks the time once the agent returns,
+and a decision that came back late is replaced by a cheap default, two cards from the deck or the
+first tickets offered, so lateness costs that player the move. An agent that ignores its deadline or
+stalls still holds up its game, and its tournament worker, for as long as it runs.
+"""
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+from game.actions import DrawCards
+
+FALLBACK_ACTION = DrawCards()  # Played instead of a move that missed its deadline
+
+
+class WorkBudget:
+    """
+    Units of work done towards a decision with a time.monotonic() deadline, or None for no limit.
+    There is time for another unit while it would finish by the deadline if it took as long as the
+    slowest unit so far, so a decision only overruns when a unit takes longer than all the ones before it.
+    """
+
+    def __init__(self, deadline: Optional[float]):
+        self.deadline = deadline
+        self.completed = 0
+        self.longest = 0.0
+
+    def has_time(self) -> bool:
+        return self.deadline is None or time.monotonic() + self.longest < self.deadline
+
+    def record(self, started: float):
+        """Count a unit of work that began at the time.monotonic() time started."""
+        self.completed += 1
+        if self.deadline is not None:
+            self.longest = max(self.longest, time.monotonic() - started)
+
+
+@dataclass
+class MoveTimer:
+    """
+    Hands out deadlines for a game's decisions and keeps count of how they went. Deadlines are only
+    checked after an agent returns, see the module docstring.
+    """
+    budget_ms: float
+    margin: float = 0.05  # Share of the budget kept back from agents' deadlines for wrapping up
+    decisions: int = 0
+    evaluations: int = 0  # Sum of the agents' reported evaluations
+    slowest_ms: float = 0.0
+    misses: Counter = field(default_factory=Counter)  # Player id -> decisions that missed the deadline
+
+    @property
+    def missed(self) -> int:
+        return sum(self.misses.values())
+
+    def start(self, agent) -> float:
+        """
+        The deadline of a decision that starts now. Agents that take one are given a slightly earlier
+        deadline, so that returning the action they settled on doesn't make them late.
+        """
+        now = time.monotonic()
+        set_deadline = getattr(agent, "set_deadline", None)
+        if set_deadline is not None:
+            set_deadline(now + self.budget_ms * (1 - self.margin) / 1000)
+        return now + self.budget_ms / 1000
+
+    def finish(self, agent, deadline: float, player_id: int) -> bool:
+        """
+        Record a decision that has returned, given its deadline, and clear the agent's deadline;
+        returns whether it was in time.
+        """
+        now = time.monotonic()
+        set_deadline = getattr(agent, "set_deadline", None)
+        if set_deadline is not None:
+            set_deadline(None)
+        self.decisions += 1
+        self.evaluations += getattr(agent, "last_evaluations", 0)
+        self.slowest_ms = max(self.slowest_ms, self.budget_ms + (now - deadline) * 1000)
+        if now > deadline:
+            self.misses[player_id] += 1
+            return False
+        return True
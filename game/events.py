@@ -0,0 +1,222 @@
+import bisect
+import struct
+import zlib
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+MAGIC = b"TTRL"
+VERSION = 1
+# Magic, format version, number of players, seed, map checksum, turns between keyframes
+HEADER = struct.Struct("<4sBBQIH")
+# Keyframe index entry: turn, offset of the keyframe record from the start of the events
+INDEX_ENTRY = struct.Struct("<II")
+# Written last: length of the events in bytes, number of turns, number of keyframes
+TRAILER = struct.Struct("<III")
+DEFAULT_KEYFRAME_INTERVAL = 10
+
+# Event kinds, stored in the high nibble of an event's first byte with the player id in the low nibble
+DRAW_DECK = 0
+DRAW_FACE_UP = 1  # Argument: index of the face-up card taken
+CLAIM_ROUTE = 2  # Argument: index of the route in the map's route list
+# Argument: number of tickets offered, then the offer index + 1 of each kept ticket, 3 bits each.
+# Values: index of each offered ticket in the map's ticket list
+KEEP_TICKETS = 3
+END_TURN = 4
+END_SETUP = 5  # The initial deal is over and the first turn begins
+KEYFRAME = 6  # Values: the full game state, see GameSnapshot.encode. Player: who played the last turn
+# A claim paid with other cards than Hand.spend would pick. Argument: index of the route in the map's
+# route list. Values: index in CARD_COLORS of each card spent
+CLAIM_ROUTE_PAID = 7
+# Whether each kind of event has an argument, and whether it has a list of values
+LAYOUT = {
+    DRAW_DECK: (False, False),
+    DRAW_FACE_UP: (True, False),
+    CLAIM_ROUTE: (True, False),
+    KEEP_TICKETS: (True, True),
+    END_TURN: (False, False),
+    END_SETUP: (False, False),
+    KEYFRAME: (False, True),
+    CLAIM_ROUTE_PAID: (True, True),
+}
+MAX_PLAYERS = 16
+
+
+class Event(NamedTuple):
+    kind: int
+    player_id: int
+    argument: int
+    values: Tuple[int, ...] = ()
+
+
+def map_checksum(game_map) -> int:
+    """Checksum of a board's cities, routes and tickets, so a log is never replayed on a different board."""
+    parts = [f"{name}:{city.x},{city.y}" for name, city in game_map.cities.items()]
+    parts += [f"{route.city1}-{route.city2}:{route.length}:{route.color.value}" for route in game_map.routes]
+    parts += [f"{ticket.city1}-{ticket.city2}:{ticket.points}" for ticket in game_map.destination_tickets]
+    return zlib.crc32("|".join(parts).encode())
+
+
+def pack_ticket_choice(offered: int, kept_indices: List[int]) -> int:
+    """Pack the number of offered tickets and the indices of the kept ones, in the order they were kept."""
+    argument = 0
+    for position, index in enumerate(kept_indices):
+        argument |= (index + 1) << (3 * position)
+    return offered | argument << 3
+
+
+def unpack_ticket_choice(argument: int) -> Tuple[int, List[int]]:
+    offered, argument = argument & 7, argument >> 3
+    kept_indices = []
+    while argument:
+        kept_indices.append((argument & 7) - 1)
+        argument >>= 3
+    return offered, kept_indices
+
+
+class EventLog:
+    """
+    Compact record of a game: the seed of its random number generator plus every decision made.
+    The deck shuffle is reproduced from the seed, so only choices and dealt tickets are stored, each as
+    one byte for the kind and player followed by variable-length integers where needed.
+
+    Every keyframe_interval turns the full game state is stored as a keyframe, and an index of turn to
+    keyframe offset is written at the end of the file, so any turn can be reached by restoring the
+    nearest keyframe and applying the few events after it. An interval of 0 disables keyframes.
+    """
+
+    def __init__(self, seed: int, num_players: int, checksum: int,
+                 keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, data: Optional[bytes] = None,
+                 keyframes: Optional[List[Tuple[int, int]]] = None, num_turns: int = 0):
+        if not 0 < num_players <= MAX_PLAYERS:
+            raise ValueError(f"Event logs support 1 to {MAX_PLAYERS} players, not {num_players}")
+        if not 0 <= seed < 2 ** 64:
+            raise ValueError("Event logs need a seed that fits in 64 unsigned bits")
+        self.seed = seed
+        self.num_players = num_players
+        self.checksum = checksum
+        self.keyframe_interval = keyframe_interval
+        self.data = bytearray(data or b"")
+        self.keyframes: List[Tuple[int, int]] = keyframes or []  # (turn, offset of the keyframe record)
+        self.num_turns = num_turns
+        self._last_player = 0  # Player who ended the last turn, stored with keyframes
+
+    @classmethod
+    def for_game(cls, seed: int, num_players: int, game_map,
+                 keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL) -> "EventLog":
+        return cls(seed, num_players, map_checksum(game_map), keyframe_interval)
+
+    def _append_int(self, value: int):
+        # Unsigned LEB128: 7 bits per byte, high bit set on all but the last byte
+        while value >= 0x80:
+            self.data.append(value & 0x7F | 0x80)
+            value >>= 7
+        self.data.append(value)
+
+    def _append(self, kind: int, player_id: int, argument: int = 0, values: Sequence[int] = ()):
+        has_argument, has_values = LAYOUT[kind]
+        self.data.append(kind << 4 | player_id)
+        if has_argument:
+            self._append_int(argument)
+        if has_values:
+            self._append_int(len(values))
+            for value in values:
+                self._append_int(value)
+
+    def draw_card(self, player_id: int, face_up_index: Optional[int] = None):
+        if face_up_index is None:
+            self._append(DRAW_DECK, player_id)
+        else:
+            self._append(DRAW_FACE_UP, player_id, face_up_index)
+
+    def claim_route(self, player_id: int, route_index: int, card_indices: Optional[Sequence[int]] = None):
+        """Record a claim, with the cards spent if they are not the ones Hand.spend would pick."""
+        if card_indices is None:
+            self._append(CLAIM_ROUTE, player_id, route_index)
+        else:
+            self._append(CLAIM_ROUTE_PAID, player_id, route_index, card_indices)
+
+    def keep_tickets(self, player_id: int, ticket_indices: List[int], kept_indices: List[int]):
+        self._append(KEEP_TICKETS, player_id, pack_ticket_choice(len(ticket_indices), kept_indices), ticket_indices)
+
+    def end_turn(self, player_id: int):
+        self.num_turns += 1
+        self._last_player = player_id
+        self._append(END_TURN, player_id)
+
+    def end_setup(self):
+        self._append(END_SETUP, 0)
+
+    @property
+    def keyframe_due(self) -> bool:
+        """Whether the turn that just ended, or the initial deal, should be followed by a keyframe."""
+        return bool(self.keyframe_interval) and self.num_turns % self.keyframe_interval == 0
+
+    def keyframe(self, values: Sequence[int]):
+        """Store the encoded game state at the end of the current turn."""
+        self.keyframes.append((self.num_turns, len(self.data)))
+        self._append(KEYFRAME, self._last_player, values=values)
+
+    def nearest_keyframe(self, turn: int) -> Optional[Tuple[int, int]]:
+        """The (turn, offset) of the last keyframe at or before the given turn, if any."""
+        position = bisect.bisect_right(self.keyframes, (turn, len(self.data)))
+        return self.keyframes[position - 1] if position else None
+
+    def events(self, offset: int = 0) -> Iterator[Event]:
+        """Decode events starting at a byte offset into the event data."""
+        data = self.data
+        position = offset
+
+        def read_int() -> int:
+            nonlocal position
+            value = shift = 0
+            while True:
+                byte = data[position]
+                position += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    return value
+
+        while position < len(data):
+            kind, player_id = data[position] >> 4, data[position] & 0xF
+            position += 1
+            has_argument, has_values = LAYOUT[kind]
+            argument = read_int() if has_argument else 0
+            values = tuple(read_int() for _ in range(read_int())) if has_values else ()
+            yield Event(kind, player_id, argument, values)
+
+    def __iter__(self) -> Iterator[Event]:
+        return self.events()
+
+    def to_bytes(self) -> bytes:
+        header = HEADER.pack(MAGIC, VERSION, self.num_players, self.seed, self.checksum, self.keyframe_interval)
+        index = b"".join(INDEX_ENTRY.pack(turn, offset) for turn, offset in self.keyframes)
+        trailer = TRAILER.pack(len(self.data), self.num_turns, len(self.keyframes))
+        return header + bytes(self.data) + index + trailer
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "EventLog":
+        if len(data) < HEADER.size + TRAILER.size:
+            raise ValueError("Event log is too short to hold a header")
+        magic, version, num_players, seed, checksum, keyframe_interval = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a game event log")
+        if version != VERSION:
+            raise ValueError(f"Unsupported event log version {version}")
+
+        events_length, num_turns, num_keyframes = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+        index_start = HEADER.size + events_length
+        if index_start + num_keyframes * INDEX_ENTRY.size + TRAILER.size != len(data):
+            raise ValueError("Event log is truncated")
+        keyframes = [INDEX_ENTRY.unpack_from(data, index_start + i * INDEX_ENTRY.size)
+                     for i in range(num_keyframes)]
+        return cls(seed, num_players, checksum, keyframe_interval, data[HEADER.size:index_start],
+                   keyframes, num_turns)
+
+    def save(self, filename: str):
+        with open(filename, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, filename: str) -> "EventLog":
+        with open(filename, "rb") as f:
+            return cls.from_bytes(f.read())
@@ -0,0 +1,125 @@
+import struct
+from typing import BinaryIO, Iterable, Optional, Tuple
+
+from PIL import GifImagePlugin, Image, ImageChops
+
+# Frame disposal method that leaves the previous frame in place, so a frame can cover only part of the screen
+DISPOSE_NONE = 1
+PALETTE_SIZE = 256
+
+
+def build_palette(image: Image.Image, colors: Iterable[Tuple[int, int, int]] = ()) -> Image.Image:
+    """
+    Build a palette holding the given colors exactly, filled up with the colors that best represent the image.
+    Listing every color the frames are drawn with keeps them exact even if they first appear in later frames.
+    """
+    colors = list(dict.fromkeys(colors))
+    adaptive = image.convert("RGB").quantize(colors=PALETTE_SIZE - len(colors), dither=Image.Dither.NONE)
+    entries = [channel for color in colors for channel in color] + adaptive.getpalette("RGB")
+
+    palette = Image.new("P", (1, 1))
+    palette.putpalette(entries[:3 * PALETTE_SIZE])
+    return palette
+
+
+class StreamingGifWriter:
+    """
+    Writes an animated GIF one frame at a time with a bounded amount of memory.
+
+    Every frame is mapped onto a single global palette, built from the given colors and the first
+    frame, and written to the file as soon as the next frame arrives. Only the last frame written
+    and one pending frame are kept in memory. With deltas enabled a frame only stores the rectangle
+    that changed since the previous one, and frames identical to the previous one extend its duration
+    instead of being written again.
+    """
+
+    def __init__(self, output_file: str, duration: int = 200, loop: int = 0,
+                 colors: Iterable[Tuple[int, int, int]] = (), deltas: bool = True):
+        """
+        Args:
+            output_file: Output GIF filename
+            duration: Duration for each frame in milliseconds
+            loop: Number of times to repeat the animation, 0 repeats forever
+            colors: RGB colors the global palette must hold exactly
+            deltas: Whether to only store the part of each frame that changed
+        """
+        self.output_file = output_file
+        self.duration = duration
+        self.loop = loop
+        self.colors = list(colors)
+        self.palette: Optional[Image.Image] = None
+        self.deltas = deltas
+        self.frame_count = 0
+
+        self._file: Optional[BinaryIO] = None
+        self._size: Optional[Tuple[int, int]] = None
+        self._previous: Optional[Image.Image] = None  # Full last frame, to find what changed
+        # Frame waiting to be written, with its offset and duration
+        self._pending: Optional[Tuple[Image.Image, Tuple[int, int], int]] = None
+
+    def __enter__(self) -> "StreamingGifWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_frame(self, image: Image.Image):
+        """Map a frame onto the global palette and queue it, writing out the frame before it."""
+        if self._file is None:
+            self._start(image)
+        elif image.size != self._size:
+            raise ValueError(f"Frame size {image.size} does not match the animation size {self._size}")
+
+        frame = image.convert("RGB").quantize(palette=self.palette, dither=Image.Dither.NONE)
+        self.frame_count += 1
+
+        if not self.deltas or self._previous is None:
+            self._queue(frame, (0, 0), frame)
+            return
+
+        bbox = ImageChops.difference(frame, self._previous).getbbox()
+        if bbox is None:
+            # Nothing changed, show the pending frame for longer
+            pending, offset, duration = self._pending
+            self._pending = (pending, offset, duration + self.duration)
+            return
+        self._queue(frame.crop(bbox), bbox[:2], frame)
+
+    def close(self):
+        """Write the last frame and the trailer, then close the file."""
+        if self._file is None:
+            return
+        self._flush()
+        self._file.write(b";")
+        self._file.close()
+        self._file = None
+        self._previous = None
+
+    def _start(self, first_frame: Image.Image):
+        """Open the output file and write the header, including the global palette."""
+        self.palette = build_palette(first_frame, self.colors)
+        self._size = first_frame.size
+        palette_bytes = bytes(self.palette.getpalette("RGB")).ljust(3 * PALETTE_SIZE, b"\0")
+
+        self._file = open(self.output_file, "wb")
+        self._file.write(
+            b"GIF89a"
+            + struct.pack("<HHBBB", self._size[0], self._size[1], 0xF7, 0, 0)  # 256 color global table
+            + palette_bytes
+            # Application extension with the loop count
+            + b"!\xff\x0bNETSCAPE2.0\x03\x01" + struct.pack("<H", self.loop) + b"\0"
+        )
+
+    def _queue(self, frame: Image.Image, offset: Tuple[int, int], full_frame: Image.Image):
+        self._flush()
+        self._pending = (frame, offset, self.duration)
+        self._previous = full_frame
+
+    def _flush(self):
+        """Write the pending frame, if any."""
+        if self._pending is None:
+            return
+        frame, offset, duration = self._pending
+        for chunk in GifImagePlugin.getdata(frame, offset, duration=duration, disposal=DISPOSE_NONE):
+            self._file.write(chunk)
+        self._pending = None
@@ -0,0 +1,151 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from game.utils import CardColor, Route
+
+# Colors that can appear in the deck and in hands, in a fixed order used to index count arrays
+CARD_COLORS = tuple(color for color in CardColor if color != CardColor.GREY)
+COLOR_INDEX = {color: i for i, color in enumerate(CARD_COLORS)}
+WILD_INDEX = COLOR_INDEX[CardColor.WILD]
+
+
+class Hand:
+    """
+    A player's train cards stored as a count per color.
+    Adding and removing cards is O(1) and checking or paying for a route is O(colors).
+    Iterating yields the cards grouped by color, so it can stand in for the old list of cards.
+    """
+    __slots__ = ("counts", "size")
+
+    def __init__(self, cards: Iterable[CardColor] = ()):
+        self.counts: List[int] = [0] * len(CARD_COLORS)
+        self.size = 0
+        for card in cards:
+            self.add(card)
+
+    def add(self, card: CardColor):
+        self.counts[COLOR_INDEX[card]] += 1
+        self.size += 1
+
+    append = add  # Allows a Hand to be used where a list of cards was expected
+
+    def remove(self, card: CardColor):
+        index = COLOR_INDEX[card]
+        if not self.counts[index]:
+            raise ValueError(f"No {card.value} card in hand")
+        self.counts[index] -= 1
+        self.size -= 1
+
+    def count(self, card: CardColor) -> int:
+        return self.counts[COLOR_INDEX[card]]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[CardColor]:
+        for color, count in zip(CARD_COLORS, self.counts):
+            for _ in range(count):
+                yield color
+
+    def __contains__(self, card: CardColor) -> bool:
+        return card in COLOR_INDEX and self.counts[COLOR_INDEX[card]] > 0
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Hand) and self.counts == other.counts
+
+    def __repr__(self) -> str:
+        return f"Hand({self.color_counts()})"
+
+    def copy(self) -> "Hand":
+        clone = Hand()
+        clone.counts = self.counts[:]
+        clone.size = self.size
+        return clone
+
+    def set_counts(self, counts: List[int]):
+        """Replace the contents of the hand with the given per-color counts."""
+        self.counts[:] = counts
+        self.size = sum(counts)
+
+    def color_counts(self) -> Dict[CardColor, int]:
+        """Number of cards held of each color, omitting colors we have none of."""
+        return {color: count for color, count in zip(CARD_COLORS, self.counts) if count}
+
+    def most_common_color(self) -> Optional[CardColor]:
+        """The non-wild color we hold the most of, or None if we only hold wild cards."""
+        best_index = None
+        for index in range(WILD_INDEX):
+            if self.counts[index] and (best_index is None or self.counts[index] > self.counts[best_index]):
+                best_index = index
+        return CARD_COLORS[best_index] if best_index is not None else None
+
+    def can_afford(self, route: Route) -> bool:
+        """Check if the hand has enough cards to claim the route."""
+        counts = self.counts
+        if route.color == CardColor.GREY:
+            # Grey routes can be claimed with any set of same-colored cards, topped up with wilds
+            best = max(counts[:WILD_INDEX])
+            return best > 0 and best + counts[WILD_INDEX] >= route.length
+        if route.color == CardColor.WILD:
+            # Wild routes can be claimed with any combination of cards
+            return self.size >= route.length
+        return counts[COLOR_INDEX[route.color]] + counts[WILD_INDEX] >= route.length
+
+    def payment(self, route: Route) -> List[CardColor]:
+        """The cards spend would use to claim the route, without removing them, or [] if we can't afford it."""
+        if not self.can_afford(route):
+            return []
+
+        counts = self.counts
+        remaining = route.length
+        cards = []
+
+        if route.color == CardColor.WILD:
+            # Use wild cards first, then any other cards
+            order = [WILD_INDEX] + list(range(WILD_INDEX))
+        else:
+            # Use matching cards first (the color we have most of for grey routes), then wilds
+            color = self.most_common_color() if route.color == CardColor.GREY else route.color
+            order = [COLOR_INDEX[color], WILD_INDEX]
+
+        for index in order:
+            used = min(counts[index], remaining)
+            if used:
+                cards.extend([CARD_COLORS[index]] * used)
+                remaining -= used
+                if not remaining:
+                    break
+        return cards
+
+    def spend(self, route: Route) -> List[CardColor]:
+        """Remove and return the cards used to claim the route, or return [] if we can't afford it."""
+        cards = self.payment(route)
+        self.pay(cards)
+        return cards
+
+    def can_pay(self, route: Route, cards: Iterable[CardColor]) -> bool:
+        """
+        Whether these exact cards are in hand and pay for the route: as many cards as the route is
+        long, all of the route's color or wild for colored routes, one color plus wilds for grey
+        routes, and anything for wild routes.
+        """
+        needed = [0] * len(CARD_COLORS)
+        for card in cards:
+            index = COLOR_INDEX.get(card)
+            if index is None:
+                return False
+            needed[index] += 1
+        if sum(needed) != route.length or any(n > held for n, held in zip(needed, self.counts)):
+            return False
+        if route.color == CardColor.WILD:
+            return True
+        colors = [index for index in range(WILD_INDEX) if needed[index]]
+        if route.color == CardColor.GREY:
+            return len(colors) <= 1
+        return not colors or colors == [COLOR_INDEX[route.color]]
+
+    def pay(self, cards: Iterable[CardColor]):
+        """Remove cards that are known to be in hand, e.g. after checking them with can_pay."""
+        counts = self.counts
+        for card in cards:
+            counts[COLOR_INDEX[card]] -= 1
+            self.size -= 1
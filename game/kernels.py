@@ -0,0 +1,106 @@
+"""
+Vectorized route feasibility and scoring.
+
+A RouteKernel holds a map's routes as arrays, including a requirement matrix saying which card colors
+count towards each route, so affordability and the agent's base route score are computed for every
+route in a handful of NumPy operations instead of a Python loop. Hands are color-count vectors indexed
+like game.hand.CARD_COLORS, with any leading dimensions: [colors] for one player, [players, colors]
+or [games, players, colors] for batches.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from game.agent import PATH_ROUTE_BONUS
+from game.hand import CARD_COLORS, COLOR_INDEX, WILD_INDEX
+from game.utils import CardColor
+
+GREY_ROUTE = -1  # Route color code for grey routes in RouteKernel.colors
+
+NUM_COLORS = len(CARD_COLORS)
+
+
+class RouteKernel:
+    """Static route tables of one map, shared by its forks, and the kernels that evaluate them."""
+
+    def __init__(self, game_map):
+        routes = game_map.routes
+        self.lengths = np.array([route.length for route in routes], dtype=np.int32)
+        self.points = np.array([game_map.calculate_route_points(route) for route in routes], dtype=np.int32)
+        self.colors = np.array([GREY_ROUTE if route.color == CardColor.GREY else COLOR_INDEX[route.color]
+                                for route in routes], dtype=np.int8)
+        self.is_grey = self.colors == GREY_ROUTE
+        self.is_wild = self.colors == WILD_INDEX
+
+        # requirements[color, route] is 1 if cards of that color count towards the route: the route's
+        # own color and wilds for colored routes, every color for wild routes, and only wilds for grey
+        # routes, whose best single color is added separately
+        self.requirements = np.zeros((NUM_COLORS, len(routes)), dtype=np.int32)
+        colored = ~self.is_grey & ~self.is_wild
+        self.requirements[self.colors[colored], np.flatnonzero(colored)] = 1
+        self.requirements[:, self.is_wild] = 1
+        self.requirements[WILD_INDEX, :] = 1
+        self._grey = self.is_grey.astype(np.int32)
+        self._no_color = -int(self.lengths.max(initial=0)) - 1  # Best color that rules out every grey route
+
+        # Off-path scores only depend on which of three bands the remaining trains fall in (below 10,
+        # 10 to 20, above 20) and on whether the hand holds more than 8 cards, so all six are precomputed
+        self._score_table = self._score_rules(np.array([9, 20, 21])[:, None], np.array([8, 9])[None, :])
+
+    @classmethod
+    def for_map(cls, game_map) -> "RouteKernel":
+        """The kernel of a map, built on first use and kept on the map so forks share it."""
+        if game_map.route_kernel is None:
+            game_map.route_kernel = cls(game_map)
+        return game_map.route_kernel
+
+    def affordable(self, hands: np.ndarray) -> np.ndarray:
+        """
+        Whether each hand can pay for each route, [..., routes] for hands of shape [..., colors].
+        Applies the same rules as Hand.can_afford to every route at once.
+        """
+        hands = np.asarray(hands, dtype=np.int32)
+        best_color = hands[..., :WILD_INDEX].max(axis=-1, keepdims=True)
+        # Grey routes add the best single color, or rule themselves out when we hold only wilds
+        best_color = np.where(best_color > 0, best_color, self._no_color)
+        return hands @ self.requirements + self._grey * best_color >= self.lengths
+
+    def _score_rules(self, trains: np.ndarray, hand_sizes: np.ndarray) -> np.ndarray:
+        """TicketToRideAI._score_route without the path bonus, for arrays of trains and hand sizes."""
+        trains, hand_sizes, lengths = trains[..., None], hand_sizes[..., None], self.lengths
+        scores = self.points * 2 - np.where(trains < 10, lengths, 0)
+        scores = scores + np.where((trains <= 20) & (lengths <= 3), 15, 0)
+        return scores + np.where(hand_sizes > 8, lengths * 3, 0)
+
+    def scores(self, remaining_trains, hand_sizes, on_path=False) -> np.ndarray:
+        """
+        TicketToRideAI._score_route for every route, [..., routes] for remaining_trains and hand_sizes
+        of shape [...]. on_path is a bool or a [..., routes] mask of routes on an incomplete ticket's path.
+        """
+        if np.ndim(remaining_trains) == 0 and np.ndim(hand_sizes) == 0:
+            # A single player: pick the precomputed row without array arithmetic
+            scores = self._score_table[(remaining_trains >= 10) + (remaining_trains > 20), int(hand_sizes > 8)]
+        else:
+            trains = np.asarray(remaining_trains)
+            band = (trains >= 10).astype(np.intp) + (trains > 20)
+            scores = self._score_table[band, (np.asarray(hand_sizes) > 8).astype(np.intp)]
+        if on_path is not False:
+            scores = scores + PATH_ROUTE_BONUS * np.asarray(on_path, dtype=np.int32)
+        return scores
+
+    def evaluate(self, hands: np.ndarray, remaining_trains, unclaimed: Optional[np.ndarray] = None,
+                 on_path=False) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Feasibility mask and base score of every route in one pass, for one hand or a batch of them.
+        Routes are only feasible where unclaimed ([..., routes] or [routes]) is true, if given.
+        """
+        hands = np.asarray(hands, dtype=np.int32)
+        mask = self.affordable(hands)
+        if unclaimed is not None:
+            mask &= unclaimed
+        return mask, self.scores(remaining_trains, hands.sum(axis=-1), on_path)
+
+
+def unclaimed_mask(game_map) -> np.ndarray:
+    """Read-only view of the map's unclaimed routes, kept up to date by the map without copying."""
+    return np.frombuffer(game_map.unclaimed_flags, dtype=bool)
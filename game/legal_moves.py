@@ -0,0 +1,132 @@
+"""
+Claimable routes per player, kept up to date as hands change and routes are claimed.
+
+Whether a hand can afford a route only depends on the route's length and on one number per group of
+routes, the group's budget: matching cards plus wilds for a color, the best single color plus wilds for
+grey routes and the hand size for wild routes. Routes are bucketed by group and length once per map,
+so each player's affordable routes are a bitmask in map order that is updated by swapping the buckets
+of the groups whose budget changed. Claimable routes are that mask, the map's unclaimed routes and the
+routes no longer than the player's remaining trains.
+"""
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from game.hand import CARD_COLORS, COLOR_INDEX, WILD_INDEX, Hand
+from game.utils import CardColor, Route
+
+if TYPE_CHECKING:
+    import numpy as np
+
+NUM_COLORS = len(CARD_COLORS)
+GREY_GROUP = NUM_COLORS  # Group of grey routes; other routes are grouped by their color's index
+
+
+def iter_bits(mask: int):
+    """Positions of the set bits of a mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class RouteGroups:
+    """Static bucketing of one map's routes by group and length, shared by the map's forks."""
+
+    def __init__(self, game_map):
+        routes = game_map.routes
+        self.max_length = max((route.length for route in routes), default=0)
+        # masks[group][budget] has a bit for every route of the group no longer than budget
+        masks = [[0] * (self.max_length + 1) for _ in range(NUM_COLORS + 1)]
+        for i, route in enumerate(routes):
+            group = GREY_GROUP if route.color == CardColor.GREY else COLOR_INDEX[route.color]
+            for budget in range(route.length, self.max_length + 1):
+                masks[group][budget] |= 1 << i
+        self.masks = masks
+        # length_masks[trains] has a bit for every route no longer than trains
+        self.length_masks = [0] * (self.max_length + 1)
+        for i, route in enumerate(routes):
+            for trains in range(route.length, self.max_length + 1):
+                self.length_masks[trains] |= 1 << i
+
+    @classmethod
+    def for_map(cls, game_map) -> "RouteGroups":
+        """The groups of a map, built on first use and kept on the map so forks share them."""
+        if game_map.route_groups is None:
+            game_map.route_groups = cls(game_map)
+        return game_map.route_groups
+
+    def budgets(self, hand: Hand) -> List[int]:
+        """The longest route of each group the hand can afford, capped at the map's longest route."""
+        counts = hand.counts
+        wild = counts[WILD_INDEX]
+        cap = self.max_length
+        budgets = [min(count + wild, cap) for count in counts]
+        budgets[WILD_INDEX] = min(hand.size, cap)
+        best = max(counts[:WILD_INDEX])
+        budgets.append(min(best + wild, cap) if best > 0 else 0)
+        return budgets
+
+
+class LegalMoves:
+    """
+    The routes each player of a game can claim. The game calls refresh whenever a player's hand
+    changes, which costs O(colors) however large the map is; claims are picked up from the map's
+    unclaimed routes when queried.
+    """
+
+    def __init__(self, game_map, players: Dict[int, dict]):
+        self.game_map = game_map
+        self.groups = RouteGroups.for_map(game_map)
+        self.players = players
+        self._budgets: Dict[int, List[int]] = {}
+        self._affordable: Dict[int, int] = {}
+        self.refresh_all()
+
+    def refresh(self, player_id: int):
+        """Bring a player's affordable routes up to date with their hand."""
+        budgets = self.groups.budgets(self.players[player_id]["hand"])
+        old_budgets = self._budgets.get(player_id)
+        if old_budgets == budgets:
+            return
+        if old_budgets is None:
+            masks = self.groups.masks
+            affordable = 0
+            for group, budget in enumerate(budgets):
+                affordable |= masks[group][budget]
+        else:
+            # Groups are disjoint and their buckets nested, so a changed budget flips just the routes in between
+            affordable = self._affordable[player_id]
+            for group, (old, new) in enumerate(zip(old_budgets, budgets)):
+                if old != new:
+                    masks = self.groups.masks[group]
+                    affordable ^= masks[old] ^ masks[new]
+        self._budgets[player_id] = budgets
+        self._affordable[player_id] = affordable
+
+    def refresh_all(self):
+        """Recompute every player from scratch, e.g. after hands were replaced wholesale."""
+        self._budgets.clear()
+        for player_id in self.players:
+            self.refresh(player_id)
+
+    def mask(self, player_id: int) -> int:
+        """Bitmask of the routes the player can claim, bit i for the map's route i."""
+        trains = min(self.players[player_id]["remaining_trains"], self.groups.max_length)
+        return self._affordable[player_id] & self.game_map.unclaimed_bits & self.groups.length_masks[trains]
+
+    def routes(self, player_id: int) -> List[Route]:
+        """Routes the player can claim, in map order."""
+        routes = self.game_map.routes
+        return [routes[i] for i in iter_bits(self.mask(player_id))]
+
+    def first(self, player_id: int) -> Optional[Route]:
+        """The first route in map order the player can claim, or None."""
+        mask = self.mask(player_id)
+        return self.game_map.routes[(mask & -mask).bit_length() - 1] if mask else None
+
+    def flags(self, player_id: int) -> "np.ndarray":
+        """The claimable routes as a bool array in map order, for vectorized code."""
+        import numpy as np
+
+        num_routes = len(self.game_map.routes)
+        packed = np.frombuffer(self.mask(player_id).to_bytes((num_routes + 7) // 8, "little"), dtype=np.uint8)
+        return np.unpackbits(packed, count=num_routes, bitorder="little").view(bool)
@@ -0,0 +1,339 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from game.paths import dijkstra
+from game.utils import City, Route, DestinationTicket, CardColor
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: only JSON maps can be read
+    tomllib = None
+
+MAGIC = b"TTRM"
+VERSION = 1
+# Magic, format version, byte order (0 little, 1 big), source checksum, number of cities, routes, tickets
+# and city pairs with routes, size of the names section, whether shortest-path tables are included
+HEADER = struct.Struct("=4sHHIIIIIIH")
+DEFAULT_MAP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps", "usa.json")
+CACHE_ENV = "TTR_MAP_CACHE"  # Directory to cache compiled maps in; unset or empty to keep them in memory
+CACHE_NAME = "ticket_to_ride"
+# All-pairs tables take 8 bytes per pair of cities, so they are left out for larger boards
+MAX_TABLE_CITIES = 1024
+NO_CITY = -1  # Unreachable in the distance table, no previous city in the path table
+COLORS = list(CardColor)  # Routes store the position of their color in this list
+
+
+class MapDefinition(NamedTuple):
+    name: str
+    cities: List[City]
+    routes: List[Tuple[str, str, int, CardColor]]
+    tickets: List[DestinationTicket]
+
+
+def parse_map(source: bytes, filename: str = "<map>") -> MapDefinition:
+    """Read a board from the text of a JSON or TOML map file and check that it is consistent."""
+    if filename.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError(f"{filename}: reading TOML maps needs Python 3.11 or later")
+        data = tomllib.loads(source.decode())
+    else:
+        data = json.loads(source)
+
+    try:
+        cities = [City(city["name"], _coordinate(city["x"]), _coordinate(city["y"])) for city in data["cities"]]
+        routes = [(route["city1"], route["city2"], int(route["length"]), CardColor(route.get("color", "grey")))
+                  for route in data["routes"]]
+        tickets = [DestinationTicket(ticket["city1"], ticket["city2"], int(ticket["points"]))
+                   for ticket in data.get("tickets", [])]
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValueError(f"{filename}: malformed map ({error!r})") from error
+
+    names = {city.name for city in cities}
+    if len(names) != len(cities):
+        raise ValueError(f"{filename}: duplicate city names")
+    for city1, city2, length, _ in routes:
+        if city1 not in names or city2 not in names:
+            raise ValueError(f"{filename}: route {city1} - {city2} uses an unknown city")
+        if city1 == city2 or length < 1:
+            raise ValueError(f"{filename}: route {city1} - {city2} must join two cities and have a length")
+    for ticket in tickets:
+        if ticket.city1 not in names or ticket.city2 not in names:
+            raise ValueError(f"{filename}: ticket {ticket.city1} - {ticket.city2} uses an unknown city")
+    return MapDefinition(data.get("name", os.path.basename(filename)), cities, routes, tickets)
+
+
+def save_map(definition: MapDefinition, filename: str):
+    """Write a board as a JSON map file, one city, route or ticket per line."""
+    def entries(items):
+        return ",\n".join(f"    {json.dumps(item)}" for item in items)
+
+    cities = entries({"name": city.name, "x": city.x, "y": city.y} for city in definition.cities)
+    routes = entries({"city1": city1, "city2": city2, "length": length, "color": color.value}
+                     for city1, city2, length, color in definition.routes)
+    tickets = entries({"city1": ticket.city1, "city2": ticket.city2, "points": ticket.points}
+                      for ticket in definition.tickets)
+    with open(filename, "w") as f:
+        f.write(f'{{\n  "name": {json.dumps(definition.name)},\n'
+                f'  "cities": [\n{cities}\n  ],\n  "routes": [\n{routes}\n  ],\n  "tickets": [\n{tickets}\n  ]\n}}\n')
+
+
+def _coordinate(value):
+    """Keep whole-number coordinates as ints so rendering is the same as for the built-in board."""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def compile_map(definition: MapDefinition, source_checksum: int = 0) -> bytes:
+    """
+    Compile a board into the binary cache format. After the header come, in order: the board and city
+    names, city coordinates as doubles, then 32-bit ints for routes (city, city, length, color), tickets
+    (city, city, points), each city's routes (offsets then route indices), each pair of cities' routes
+    (offsets then route indices) and, for boards up to MAX_TABLE_CITIES cities, the ownership-blind
+    distance and previous-city tables between every pair of cities.
+    """
+    city_index = {city.name: i for i, city in enumerate(definition.cities)}
+    num_cities = len(definition.cities)
+
+    coordinates = array("d")
+    for city in definition.cities:
+        coordinates.extend((city.x, city.y))
+    routes = array("i")
+    city_route_ids: List[List[int]] = [[] for _ in range(num_cities)]
+    pair_route_ids: Dict[Tuple[int, int], List[int]] = {}
+    for i, (city1, city2, length, color) in enumerate(definition.routes):
+        index1, index2 = city_index[city1], city_index[city2]
+        routes.extend((index1, index2, length, COLORS.index(color)))
+        city_route_ids[index1].append(i)
+        city_route_ids[index2].append(i)
+        pair_route_ids.setdefault(_pair_key(city1, city2), []).append(i)
+    tickets = array("i")
+    for ticket in definition.tickets:
+        tickets.extend((city_index[ticket.city1], city_index[ticket.city2], ticket.points))
+
+    indexes = array("i")
+    for groups in (city_route_ids, list(pair_route_ids.values())):
+        offset = 0
+        for group in groups:
+            indexes.append(offset)
+            offset += len(group)
+        indexes.append(offset)
+        for group in groups:
+            indexes.extend(group)
+
+    tables = array("i")
+    has_tables = num_cities <= MAX_TABLE_CITIES
+    if has_tables:
+        city_routes = {city.name: [] for city in definition.cities}
+        for city1, city2, length, color in definition.routes:
+            route = Route(city1, city2, length, color)
+            city_routes[city1].append(route)
+            city_routes[city2].append(route)
+        previous_table = array("i")
+        for city in definition.cities:
+            distances, previous = dijkstra(city_routes, city.name)
+            tables.extend(distances.get(other.name, NO_CITY) for other in definition.cities)
+            previous_table.extend(NO_CITY if previous.get(other.name) is None else city_index[previous[other.name]]
+                                  for other in definition.cities)
+        tables.extend(previous_table)
+
+    names = "\0".join([definition.name] + [city.name for city in definition.cities]).encode()
+    names += b"\0" * (-len(names) % 8)  # Keep the doubles that follow aligned
+    header = HEADER.pack(MAGIC, VERSION, sys.byteorder == "big", source_checksum, num_cities,
+                         len(definition.routes), len(definition.tickets), len(pair_route_ids), len(names),
+                         has_tables)
+    header += b"\0" * (-len(header) % 8)
+    return b"".join([header, names, coordinates.tobytes(), routes.tobytes(), tickets.tobytes(),
+                     indexes.tobytes(), tables.tobytes()])
+
+
+def _pair_key(city1: str, city2: str) -> Tuple[str, str]:
+    return (city1, city2) if city1 <= city2 else (city2, city1)
+
+
+class CompiledMap:
+    """
+    A board read from the binary cache, usually straight from a memory-mapped file.
+
+    Cities and tickets are created once and shared by every map built from the board; routes carry
+    ownership, so each map gets its own. Shortest paths are decoded from the tables one source city
+    at a time, on first use, and shared as well.
+    """
+
+    def __init__(self, data, source_checksum: Optional[int] = None):
+        self._data = data  # Keeps the memory map alive while views into it exist
+        view = memoryview(data)
+        (magic, version, big_endian, checksum, num_cities, num_routes, num_tickets, num_pairs, names_size,
+         has_tables) = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not a compiled map")
+        if version != VERSION or big_endian != (sys.byteorder == "big"):
+            raise ValueError("Compiled map was written by another version or machine")
+        if source_checksum is not None and checksum != source_checksum:
+            raise ValueError("Compiled map is out of date")
+
+        position = HEADER.size + (-HEADER.size % 8)
+
+        def section(size: int, item_format: str = "i") -> memoryview:
+            nonlocal position
+            start = position
+            position += size * (8 if item_format == "d" else 4)
+            return view[start:position].cast(item_format)
+
+        names = bytes(view[position:position + names_size]).rstrip(b"\0").decode().split("\0")
+        position += names_size
+        self.name = names[0]
+        self.city_names: List[str] = names[1:]
+        self._coordinates = section(2 * num_cities, "d")
+        self._routes = section(4 * num_routes)
+        self._tickets = section(3 * num_tickets)
+        self._city_offsets = section(num_cities + 1)
+        self._city_route_ids = section(2 * num_routes)
+        self._pair_offsets = section(num_pairs + 1)
+        self._pair_route_ids = section(num_routes)
+        self.has_path_tables = bool(has_tables)
+        if self.has_path_tables:
+            self._distances = section(num_cities * num_cities)
+            self._previous = section(num_cities * num_cities)
+        if position > len(view):
+            raise ValueError("Compiled map is truncated")
+
+        self._cities: Optional[Dict[str, City]] = None
+        self._destination_tickets: Optional[List[DestinationTicket]] = None
+        self.static_paths: Dict[str, Tuple[Dict[str, int], Dict[str, Optional[str]]]] = {}
+        self._city_index = {name: i for i, name in enumerate(self.city_names)}
+
+    def cities(self) -> Dict[str, City]:
+        if self._cities is None:
+            coordinates = self._coordinates
+            self._cities = {name: City(name, _coordinate(coordinates[2 * i]), _coordinate(coordinates[2 * i + 1]))
+                            for i, name in enumerate(self.city_names)}
+        return self._cities
+
+    def routes(self) -> List[Route]:
+        """Fresh, unclaimed routes in file order."""
+        names = self.city_names
+        rows = self._routes
+        return [Route(names[rows[i]], names[rows[i + 1]], rows[i + 2], COLORS[rows[i + 3]])
+                for i in range(0, len(rows), 4)]
+
+    def destination_tickets(self) -> List[DestinationTicket]:
+        if self._destination_tickets is None:
+            names = self.city_names
+            rows = self._tickets
+            self._destination_tickets = [DestinationTicket(names[rows[i]], names[rows[i + 1]], rows[i + 2])
+                                         for i in range(0, len(rows), 3)]
+        return self._destination_tickets
+
+    def route_indexes(self, routes: List[Route]) -> Tuple[Dict[str, List[Route]], Dict[Tuple[str, str], List[Route]]]:
+        """The city -> routes and city pair -> routes indexes for a list of routes built by routes()."""
+        city_routes = {}
+        offsets, route_ids = self._city_offsets, self._city_route_ids
+        for i, name in enumerate(self.city_names):
+            city_routes[name] = [routes[j] for j in route_ids[offsets[i]:offsets[i + 1]]]
+        pair_routes = {}
+        offsets, route_ids = self._pair_offsets, self._pair_route_ids
+        for i in range(len(offsets) - 1):
+            group = [routes[j] for j in route_ids[offsets[i]:offsets[i + 1]]]
+            pair_routes[_pair_key(group[0].city1, group[0].city2)] = group
+        return city_routes, pair_routes
+
+    def single_source(self, source: str) -> Tuple[Dict[str, int], Dict[str, Optional[str]]]:
+        """Ownership-blind distances and previous cities from source, decoded from the tables once."""
+        result = self.static_paths.get(source)
+        if result is None:
+            names = self.city_names
+            num_cities = len(names)
+            start = self._city_index[source] * num_cities
+            distance_row = self._distances[start:start + num_cities]
+            previous_row = self._previous[start:start + num_cities]
+            distances, previous = {}, {}
+            for name, distance, before in zip(names, distance_row, previous_row):
+                if distance != NO_CITY:
+                    distances[name] = distance
+                    previous[name] = names[before] if before != NO_CITY else None
+            result = self.static_paths[source] = (distances, previous)
+        return result
+
+
+def user_cache_dir() -> str:
+    """ticket_to_ride under the user's cache directory, a good place to opt into caching with set_cache_dir."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, CACHE_NAME)
+
+
+# Compiled maps are only written to disk once a directory is chosen, through TTR_MAP_CACHE or set_cache_dir
+_cache_dir: Optional[str] = os.environ.get(CACHE_ENV) or None
+
+
+def set_cache_dir(directory: Optional[str]):
+    """Cache compiled maps in directory from now on, or only in memory if it is None."""
+    global _cache_dir
+    _cache_dir = directory
+
+
+def compiled_path(filename: str) -> Optional[str]:
+    """
+    Where the compiled form of a map file is cached, or None if caching is off. The name includes a
+    hash of the source's path, so map files of the same name in different directories don't collide.
+    """
+    if _cache_dir is None:
+        return None
+    path = os.path.abspath(filename)
+    base = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(_cache_dir, f"{base}-{zlib.crc32(path.encode()):08x}.ttrmap")
+
+
+def _map_file(filename: str, source_checksum: int) -> Optional[CompiledMap]:
+    """Memory-map a compiled map, or return None if it is missing or stale."""
+    try:
+        with open(filename, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return CompiledMap(data, source_checksum)
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+_loaded: Dict[str, CompiledMap] = {}
+
+
+def load_compiled_map(filename: str = DEFAULT_MAP_FILE, reload: bool = False) -> CompiledMap:
+    """
+    Load a map file, compiled. A board is read once per process: later loads return it without
+    touching the filesystem, unless reload is set, which reads the source again and picks up any
+    change to it. Reading compiles the board in memory. With a cache directory, see set_cache_dir, the
+    compiled board is written there, or memory-mapped from there if one compiled from the same contents
+    already exists, e.g. written by another process; a directory that can't be written is ignored.
+    """
+    path = os.path.abspath(filename)
+    board = _loaded.get(path)
+    if board is not None and not reload:
+        return board
+
+    with open(path, "rb") as f:
+        source = f.read()
+    checksum = zlib.crc32(source)
+    cache_file = compiled_path(path)
+    board = _map_file(cache_file, checksum) if cache_file is not None else None
+    if board is None:
+        data = compile_map(parse_map(source, path), checksum)
+        if cache_file is not None:
+            try:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                temporary = f"{cache_file}.{os.getpid()}.tmp"
+                with open(temporary, "wb") as f:
+                    f.write(data)
+                os.replace(temporary, cache_file)  # Atomic, so concurrent workers never read half a file
+                board = _map_file(cache_file, checksum)
+            except OSError:
+                pass
+        if board is None:
+            board = CompiledMap(data, checksum)
+
+    _loaded[path] = board
+    return board
@@ -0,0 +1,153 @@
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+from game.connectivity import UnionFind
+from game.map import TicketToRideMap
+from game.map_loader import MapDefinition
+from game.paths import dijkstra
+from game.utils import City, Route, DestinationTicket, CardColor
+
+# Relative frequency of each route color; grey routes are the most common on the real boards
+DEFAULT_COLOR_WEIGHTS: Dict[CardColor, float] = {
+    CardColor.RED: 1, CardColor.BLUE: 1, CardColor.GREEN: 1, CardColor.YELLOW: 1,
+    CardColor.BLACK: 1, CardColor.WHITE: 1, CardColor.ORANGE: 1, CardColor.PINK: 1,
+    CardColor.GREY: 2,
+}
+NEIGHBOURS = 8  # Candidate routes considered from each city to its nearest cities
+MAX_ROUTE_LENGTH = 6  # Longer routes exist on the boards but are rare; they are scored up to length 8
+
+
+def _segments_cross(a, b, c, d) -> bool:
+    """Whether segments ab and cd properly cross. Segments sharing an endpoint do not count."""
+    if a in (c, d) or b in (c, d):
+        return False
+
+    def orientation(p, q, r):
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+
+    return (orientation(a, b, c) * orientation(a, b, d) < 0 and
+            orientation(c, d, a) * orientation(c, d, b) < 0)
+
+
+def _layout(num_cities: int, width: int, height: int, rng: random.Random) -> List[Tuple[int, int]]:
+    """City positions jittered inside randomly chosen cells of a grid, so cities never bunch up."""
+    columns = max(1, round(math.sqrt(1.5 * num_cities * width / height)))
+    rows = max(1, math.ceil(1.5 * num_cities / columns))
+    cell_width, cell_height = width / columns, height / rows
+    cells = rng.sample(range(columns * rows), num_cities)
+    return [(round((cell % columns + rng.uniform(0.15, 0.85)) * cell_width),
+             round((cell // columns + rng.uniform(0.15, 0.85)) * cell_height)) for cell in cells]
+
+
+def generate_map_definition(num_cities: int = 50, num_routes: Optional[int] = None,
+                            num_tickets: Optional[int] = None,
+                            color_weights: Optional[Dict[CardColor, float]] = None,
+                            double_route_fraction: float = 0.1, seed: Optional[int] = None,
+                            width: int = 1000, height: int = 750) -> MapDefinition:
+    """
+    Generate a random connected board.
+
+    Cities are spread over a width x height layout. Routes join nearby cities: first a spanning tree
+    so every city is reachable, then the shortest remaining candidates that do not cross an existing
+    route, so the board stays close to planar. A fraction of the routes are doubled with a second
+    color. Route lengths follow the distance between the cities, and tickets are scored with the
+    length of the shortest path between their cities, as on the real boards.
+
+    Args:
+        num_cities: Number of cities, at least 2
+        num_routes: Number of routes including doubles, about 2.2 per city by default
+        num_tickets: Number of destination tickets, about one per city by default (at least 20)
+        color_weights: Relative frequency of each route color
+        double_route_fraction: Fraction of routes that are the second route of a double
+        seed: Seed for the generator, the same seed and arguments giving the same board
+    """
+    if num_cities < 2:
+        raise ValueError("A board needs at least 2 cities")
+    rng = random.Random(seed)
+    num_routes = num_routes if num_routes is not None else round(2.2 * num_cities)
+    num_tickets = num_tickets if num_tickets is not None else max(20, num_cities)
+    weights = color_weights or DEFAULT_COLOR_WEIGHTS
+    colors, color_weights = list(weights), list(weights.values())
+
+    names = [f"City {i + 1}" for i in range(num_cities)]
+    positions = _layout(num_cities, width, height, rng)
+    cities = [City(name, x, y) for name, (x, y) in zip(names, positions)]
+
+    # Candidate routes from each city to its nearest neighbours, shortest first
+    candidates = set()
+    for i, (x, y) in enumerate(positions):
+        nearest = sorted(range(num_cities), key=lambda j: (positions[j][0] - x) ** 2 + (positions[j][1] - y) ** 2)
+        candidates.update((min(i, j), max(i, j)) for j in nearest[1:NEIGHBOURS + 1])
+    candidates = sorted(candidates, key=lambda pair: (math.dist(positions[pair[0]], positions[pair[1]]), pair))
+
+    # A spanning tree first, joining any components the neighbour candidates left apart
+    network = UnionFind()
+    edges: List[Tuple[int, int]] = []
+    for i, j in candidates:
+        if not network.connected(names[i], names[j]):
+            network.union(names[i], names[j])
+            edges.append((i, j))
+    for i in range(1, num_cities):
+        if not network.connected(names[0], names[i]):
+            j = min((j for j in range(num_cities) if network.connected(names[0], names[j])),
+                    key=lambda j: math.dist(positions[i], positions[j]))
+            network.union(names[i], names[j])
+            edges.append((j, i))
+
+    num_doubles = round(num_routes * double_route_fraction)
+    chosen = set(edges)
+    for i, j in candidates:
+        if len(edges) >= num_routes - num_doubles:
+            break
+        if (i, j) in chosen:
+            continue
+        if not any(_segments_cross(positions[i], positions[j], positions[a], positions[b]) for a, b in edges):
+            chosen.add((i, j))
+            edges.append((i, j))
+
+    # Lengths scale with distance, with the median route 3 trains long
+    lengths = sorted(math.dist(positions[i], positions[j]) for i, j in edges)
+    unit = lengths[len(lengths) // 2] / 3
+
+    def route_length(i: int, j: int) -> int:
+        return min(MAX_ROUTE_LENGTH, max(1, round(math.dist(positions[i], positions[j]) / unit)))
+
+    doubled = set(rng.sample(range(len(edges)), min(num_doubles, len(edges))))
+    routes = []
+    for position, (i, j) in enumerate(edges):
+        length = route_length(i, j)
+        color = rng.choices(colors, color_weights)[0]
+        routes.append((names[i], names[j], length, color))
+        if position in doubled:
+            other_colors = [c for c in colors if c != color or c == CardColor.GREY] or colors
+            second = rng.choices(other_colors, [weights[c] for c in other_colors])[0]
+            routes.append((names[i], names[j], length, second))
+
+    city_routes = {name: [] for name in names}
+    for city1, city2, length, color in routes:
+        route = Route(city1, city2, length, color)
+        city_routes[city1].append(route)
+        city_routes[city2].append(route)
+    tickets = []
+    pairs = set()
+    max_pairs = num_cities * (num_cities - 1) // 2
+    while len(tickets) < min(num_tickets, max_pairs):
+        city1, city2 = rng.sample(names, 2)
+        pair = (city1, city2) if city1 <= city2 else (city2, city1)
+        if pair in pairs:
+            continue
+        pairs.add(pair)
+        tickets.append(DestinationTicket(city1, city2, dijkstra(city_routes, city1)[0][city2]))
+
+    return MapDefinition(f"Generated {num_cities} cities (seed {seed})", cities, routes, tickets)
+
+
+def generate_map(num_cities: int = 50, seed: Optional[int] = None, **kwargs) -> TicketToRideMap:
+    """Generate a random board as a playable map, see generate_map_definition for the arguments."""
+    definition = generate_map_definition(num_cities, seed=seed, **kwargs)
+    return TicketToRideMap(
+        {city.name: city for city in definition.cities},
+        [Route(city1, city2, length, color) for city1, city2, length, color in definition.routes],
+        definition.tickets,
+    )
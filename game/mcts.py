@@ -0,0 +1,353 @@
+"""
+Monte Carlo tree search agent.
+
+MCTSAgent picks among a handful of candidate actions with determinized UCT. Every simulation deals the
+information the player can't see (the deck order, the opponents' hands and the opponents' tickets) at
+random, consistently with what is visible, applies one candidate and plays the game out with the
+heuristic agent for every player. The heuristic also proposes the candidates and gives its own choice
+most of the prior, so with a tiny budget the agent plays like TicketToRideAI and it gets stronger as the
+budget grows.
+
+The tree is one ply deep: later decisions are left to the rollout policy, as each determinization would
+otherwise need its own subtree. Simulations can run in worker processes, each growing its own tree from
+the same position (root parallelization); their visit counts are summed before picking the most visited
+candidate.
+"""
+import atexit
+import hashlib
+import math
+import pickle
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from game.actions import Action, ClaimRoute, DrawCards, DrawTickets
+from game.agent import DecisionContext, TicketToRideAI
+from game.deadlines import WorkBudget
+from game.hand import CARD_COLORS, COLOR_INDEX
+from game.map import TicketToRideMap
+from game.simulation import advance_turn, play_out, take_action
+from game.state import GameState, GameSnapshot
+from game.utils import Route
+from game.zobrist import TranspositionTable, combine
+
+DEFAULT_SIMULATIONS = 100
+DEFAULT_MAX_TURNS = 80  # Turn limit of rollouts, as in simulate_game
+EXPLORATION = 1.0  # Weight of the prior-scaled exploration term
+HEURISTIC_PRIOR = 0.5  # Share of the prior given to the heuristic agent's own choice
+MAX_CLAIM_CANDIDATES = 6  # Claimable routes considered, best scoring first
+SCORE_SCALE = 10.0  # Points of lead over the best opponent worth a reward of about 0.73
+ROLLOUT_TABLE_SIZE = 1 << 12  # Rollout results kept per agent or worker
+
+
+@dataclass
+class SearchStats:
+    """Simulations and total reward of each candidate action, in the order the candidates were given."""
+    visits: List[int]
+    rewards: List[float]
+    transpositions: int = 0  # Simulations answered from the transposition table instead of a rollout
+
+    @property
+    def simulations(self) -> int:
+        return sum(self.visits)
+
+    def merge(self, other: "SearchStats") -> "SearchStats":
+        return SearchStats([a + b for a, b in zip(self.visits, other.visits)],
+                           [a + b for a, b in zip(self.rewards, other.rewards)],
+                           self.transpositions + other.transpositions)
+
+    def best(self) -> int:
+        """Index of the most visited candidate, the first one (the heuristic's choice) on ties."""
+        return max(range(len(self.visits)), key=lambda i: self.visits[i])
+
+
+def determinize(game: GameState, player_id: int, rng: random.Random) -> GameState:
+    """
+    A clone of the game in which everything the player can't see is dealt at random: the deck and the
+    opponents' hands are shuffled together and redealt keeping hand sizes, and the opponents' tickets
+    are redrawn from those and the tickets still in the pile, keeping how many each holds.
+    """
+    world = game.clone(random.Random(rng.getrandbits(64)))
+    opponents = [player for other_id, player in world.players.items() if other_id != player_id]
+
+    cards = list(world.train_deck)
+    for player in opponents:
+        cards.extend(player["hand"])
+    rng.shuffle(cards)
+    for player in opponents:
+        counts = [0] * len(CARD_COLORS)
+        for _ in range(len(player["hand"])):
+            counts[COLOR_INDEX[cards.pop()]] += 1
+        player["hand"].set_counts(counts)
+    world.train_deck[:] = cards
+
+    game_map = world.map
+    tickets = [ticket for ticket in game_map.destination_tickets if ticket not in game_map.drawn_tickets]
+    for player in opponents:
+        tickets.extend(player["destination_tickets"])
+    rng.shuffle(tickets)
+    for player in opponents:
+        count = len(player["destination_tickets"])
+        player["destination_tickets"][:] = tickets[len(tickets) - count:]
+        del tickets[len(tickets) - count:]
+    game_map.drawn_tickets[:] = [ticket for player in world.players.values()
+                                 for ticket in player["destination_tickets"]]
+
+    world.legal_moves.refresh_all()
+    world.hash = world.zobrist.position_hash(world)
+    return world
+
+
+def rollout(world: GameState, player_id: int, action: Action, max_turns: int,
+            table: Optional[TranspositionTable] = None, world_seed: int = 0) -> float:
+    """
+    Play the action and then the rest of the game with the heuristic agent. The reward is the lead
+    over the best opponent squashed into (0, 1), above 0.5 exactly when the player wins; margins
+    vary far less between rollouts than wins and losses do.
+
+    With a table, rewards are kept under the position reached by the action in the deal made from
+    world_seed, so candidates that reach the same position, such as taking a face-up card of the
+    color the deck would have given, share one rollout.
+    """
+    for player in world.players.values():
+        player["ai_agent"] = TicketToRideAI(player, world.map)
+    take_action(world, player_id, action)
+    key = combine(world.hash, world_seed)
+    if table is not None:
+        reward = table.get(key)
+        if reward is not None:
+            return reward
+
+    turn_number = world.turn_number
+    play_out(world, advance_turn(world, player_id), max_turns)
+    score = world.final_score(player_id)
+    best_other = max(world.final_score(other_id) for other_id in world.players if other_id != player_id)
+    reward = 1 / (1 + math.exp(-(score - best_other) / SCORE_SCALE))
+    if table is not None:
+        table.store(key, reward, depth=world.turn_number - turn_number)
+    return reward
+
+
+def run_search(game: GameState, player_id: int, candidates: Sequence[Action], priors: Sequence[float],
+               simulations: Optional[int], deadline: Optional[float], seed: int,
+               max_turns: int = DEFAULT_MAX_TURNS, exploration: float = EXPLORATION,
+               table: Optional[TranspositionTable] = None) -> SearchStats:
+    """
+    Run simulations from the game until the simulation budget is spent or the next simulation might
+    not finish before the time.monotonic() deadline, whichever comes first. Each one picks the candidate with the highest
+    mean reward + exploration * prior * sqrt(simulations) / (1 + visits), unvisited candidates
+    counting as the mean reward so far.
+
+    The n-th simulation of every candidate is played in the same determinization and with the same
+    random numbers, so candidates are compared on the same deals rather than on independent luck.
+    Rollouts are shared through the transposition table, if given.
+    """
+    if table is not None:
+        table.new_search()
+        hits = table.hits
+    rng = random.Random(seed)
+    world_seeds: List[int] = []
+    visits = [0] * len(candidates)
+    rewards = [0.0] * len(candidates)
+    work = WorkBudget(deadline)
+    done = 0
+    while (simulations is None or done < simulations) and work.has_time():
+        started = time.monotonic()
+        mean = sum(rewards) / done if done else 0.5
+        spread = exploration * math.sqrt(done + 1)
+
+        def value(i: int) -> float:
+            exploit = rewards[i] / visits[i] if visits[i] else mean
+            return exploit + spread * priors[i] / (1 + visits[i])
+
+        choice = max(range(len(candidates)), key=value)
+        if visits[choice] == len(world_seeds):
+            world_seeds.append(rng.getrandbits(64))
+        world_seed = world_seeds[visits[choice]]
+        world = determinize(game, player_id, random.Random(world_seed))
+        rewards[choice] += rollout(world, player_id, candidates[choice], max_turns, table, world_seed)
+        visits[choice] += 1
+        done += 1
+        work.record(started)
+    return SearchStats(visits, rewards, table.hits - hits if table is not None else 0)
+
+
+# Worker processes keep a game per board and player count, and restore each search's position into it
+_worker_games: Dict[Tuple[str, int], GameState] = {}
+_worker_tables: Dict[int, TranspositionTable] = {}  # Rollout tables of a worker by size
+_pools: Dict[int, ProcessPoolExecutor] = {}  # Shared by the agents searching with that many workers
+_pool_users: Counter = Counter()  # Worker count -> agents holding that pool
+
+
+def _encode_action(game_map: TicketToRideMap, action: Action):
+    """Routes are sent to workers by index, as each worker has its own copy of the board."""
+    if isinstance(action, ClaimRoute):
+        return game_map.route_index[action.route], action.cards
+    return action
+
+
+def _decode_action(game_map: TicketToRideMap, action) -> Action:
+    if isinstance(action, tuple):
+        route_index, cards = action
+        return ClaimRoute(game_map.routes[route_index], cards)
+    return action
+
+
+def _search_task(map_key: str, map_data: bytes, snapshot: GameSnapshot, player_id: int, candidates: list,
+                 priors: Sequence[float], simulations: Optional[int], deadline: Optional[float], seed: int,
+                 max_turns: int, exploration: float, table_size: int) -> SearchStats:
+    """Run one worker's share of a search, on its own copy of the board."""
+    key = (map_key, len(snapshot.players))
+    game = _worker_games.get(key)
+    if game is None:
+        cities, routes, tickets = pickle.loads(map_data)
+        game = _worker_games[key] = GameState(TicketToRideMap(cities, routes, tickets), len(snapshot.players))
+    game.restore(snapshot)
+    candidates = [_decode_action(game.map, action) for action in candidates]
+    table = None
+    if table_size:
+        table = _worker_tables.get(table_size)
+        if table is None:
+            table = _worker_tables[table_size] = TranspositionTable(table_size)
+    return run_search(game, player_id, candidates, priors, simulations, deadline, seed, max_turns, exploration,
+                      table)
+
+
+def _acquire_pool(workers: int) -> ProcessPoolExecutor:
+    """The process pool shared by every agent searching with this many workers, started on first use."""
+    pool = _pools.get(workers)
+    if pool is None:
+        pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    _pool_users[workers] += 1
+    return pool
+
+
+def _release_pool(workers: int):
+    """Drop an agent's hold on a pool, shutting it down once no agent holds it."""
+    _pool_users[workers] -= 1
+    if _pool_users[workers] <= 0:
+        del _pool_users[workers]
+        pool = _pools.pop(workers, None)
+        if pool is not None:
+            pool.shutdown()
+
+
+@atexit.register
+def shutdown_pools():
+    """Shut down every search process pool, including those of agents that were never closed."""
+    _pool_users.clear()
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown(cancel_futures=True)
+
+
+class MCTSAgent(TicketToRideAI):
+    """
+    Search-based agent with a budget of simulations and/or milliseconds per decision; the search stops
+    at whichever runs out first. Tickets are chosen by the heuristic. Outside of a GameState (no game in
+    the player state) or without a budget it plays exactly like TicketToRideAI.
+
+    Agent factories are called with the player state and the map only, so pass options with
+    functools.partial, e.g. partial(MCTSAgent, simulations=400, workers=8).
+
+    Agents with several workers share a process pool per worker count, started by their first search.
+    close() releases an agent's hold on it, and a pool shuts down once no agent holds it; pools still
+    running at interpreter exit, or after shutdown_pools(), are shut down then.
+    """
+
+    def __init__(self, player_state, game_map, simulations: Optional[int] = DEFAULT_SIMULATIONS,
+                 time_limit_ms: Optional[float] = None, workers: int = 1, exploration: float = EXPLORATION,
+                 max_claims: int = MAX_CLAIM_CANDIDATES, max_turns: int = DEFAULT_MAX_TURNS,
+                 seed: Optional[int] = None, table_size: int = ROLLOUT_TABLE_SIZE):
+        super().__init__(player_state, game_map)
+        self.simulations = simulations
+        self.time_limit_ms = time_limit_ms
+        self.workers = workers
+        self.exploration = exploration
+        self.max_claims = max_claims
+        self.max_turns = max_turns
+        self.rng = random.Random(seed)
+        self.table_size = table_size  # Size of the rollout transposition table, 0 for none
+        self.table = TranspositionTable(table_size) if table_size else None
+        self.last_search: Optional[SearchStats] = None  # Statistics of the latest decision's search
+        self._map_data: Optional[Tuple[str, bytes]] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def close(self):
+        """Release the agent's worker processes; a later search starts them again."""
+        pool, self._pool = self._pool, None
+        if pool is not None and _pools.get(self.workers) is pool:  # Not already shut down by shutdown_pools
+            _release_pool(self.workers)
+
+    def choose_action(self) -> Action:
+        """
+        The most simulated candidate. The search stops at the agent's own time limit or the deadline set
+        by the engine, whichever is sooner; last_evaluations counts the heuristic's ticket path searches
+        plus the simulations.
+        """
+        deadline = time.monotonic() + self.time_limit_ms / 1000 if self.time_limit_ms is not None else None
+        if self.deadline is not None:
+            deadline = self.deadline if deadline is None else min(deadline, self.deadline)
+        heuristic_action = super().choose_action()
+        game = self.player_state.get("game")
+        if game is None or (self.simulations is None and deadline is None):
+            return heuristic_action
+
+        candidates = self._candidates(game, heuristic_action)
+        if len(candidates) == 1:
+            return heuristic_action
+        priors = [HEURISTIC_PRIOR] + [(1 - HEURISTIC_PRIOR) / (len(candidates) - 1)] * (len(candidates) - 1)
+        self.last_search = self._search(game, candidates, priors, deadline)
+        self.last_evaluations += self.last_search.simulations
+        return candidates[self.last_search.best()]
+
+    def _candidates(self, game: GameState, heuristic_action: Action) -> List[Action]:
+        """The heuristic's choice first, then the best scoring claims, card draws and a ticket draw."""
+        hand = self.player_state["hand"]
+        context = DecisionContext(self)
+        routes = sorted(game.legal_moves.routes(self.player_state["player_id"]),
+                        key=lambda route: context.route_score(route, is_path_route=False), reverse=True)
+        candidates = [heuristic_action]
+        candidates += [ClaimRoute(route, tuple(hand.payment(route))) for route in routes[:self.max_claims]]
+        candidates += [DrawCards(self._face_up_picks(context.needed_colors)), DrawCards()]
+        if len(self.game_map.drawn_tickets) < len(self.game_map.destination_tickets):
+            candidates.append(DrawTickets())
+        return list(dict.fromkeys(candidates))
+
+    def _search(self, game: GameState, candidates: List[Action], priors: List[float],
+                deadline: Optional[float]) -> SearchStats:
+        player_id = self.player_state["player_id"]
+        if self.workers <= 1:
+            return run_search(game, player_id, candidates, priors, self.simulations, deadline,
+                              self.rng.getrandbits(64), self.max_turns, self.exploration, self.table)
+
+        # Split the simulations between the workers; with only a time limit each runs until the deadline
+        shares = [None] * self.workers
+        if self.simulations is not None:
+            shares = [self.simulations // self.workers + (i < self.simulations % self.workers)
+                      for i in range(self.workers)]
+        map_key, map_data = self._board()
+        snapshot = game.snapshot()
+        encoded = [_encode_action(game.map, action) for action in candidates]
+        if self._pool is None or _pools.get(self.workers) is not self._pool:
+            self._pool = _acquire_pool(self.workers)
+        futures = [self._pool.submit(_search_task, map_key, map_data, snapshot, player_id, encoded, priors, share,
+                               deadline, self.rng.getrandbits(64), self.max_turns, self.exploration,
+                               self.table_size)
+                   for share in shares if share != 0]
+        stats = SearchStats([0] * len(candidates), [0.0] * len(candidates))
+        for future in futures:
+            stats = stats.merge(future.result())
+        return stats
+
+    def _board(self) -> Tuple[str, bytes]:
+        """The board's cities, unclaimed routes and tickets pickled for the workers, with a digest to cache them by."""
+        if self._map_data is None:
+            game_map = self.game_map
+            routes = [Route(route.city1, route.city2, route.length, route.color) for route in game_map.routes]
+            map_data = pickle.dumps((game_map.cities, routes, game_map.destination_tickets))
+            self._map_data = hashlib.md5(map_data).hexdigest(), map_data
+        return self._map_data
@@ -0,0 +1,108 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+
+def dijkstra(city_routes: Dict[str, List], source: str, player_id: Optional[int] = None):
+    """
+    Single-source Dijkstra over a city -> routes index, skipping routes owned by players other than player_id.
+    Ties are broken by city name so results are deterministic.
+    """
+    distances = {source: 0}
+    previous = {source: None}
+    visited = set()
+    heap = [(0, source)]
+
+    while heap:
+        distance, current = heapq.heappop(heap)
+        if current in visited:
+            continue
+        visited.add(current)
+
+        for route in city_routes.get(current, []):
+            if player_id is not None and route.claimed_by is not None and route.claimed_by != player_id:
+                continue
+
+            next_city = route.city2 if route.city1 == current else route.city1
+            new_dist = distance + route.length
+            if next_city not in distances or new_dist < distances[next_city]:
+                distances[next_city] = new_dist
+                previous[next_city] = current
+                heapq.heappush(heap, (new_dist, next_city))
+
+    return distances, previous
+
+
+class ShortestPaths:
+    """
+    Shortest-path service shared by everything that plans over a map.
+
+    Runs heap-based Dijkstra over the map's city -> routes index and caches single-source
+    results. Per-player results skip routes owned by other players and are dropped whenever
+    the map's claim version changes, i.e. only after a route has actually been claimed.
+    """
+
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self._claim_version = game_map.claim_version
+        # (player_id, source) -> (distances, previous city on the shortest path)
+        self._cache: Dict[Tuple[Optional[int], str], Tuple[Dict[str, int], Dict[str, Optional[str]]]] = {}
+        # Ownership-blind results never go stale, so they are kept separately
+        self._static_cache: Dict[str, Tuple[Dict[str, int], Dict[str, Optional[str]]]] = {}
+        self._static_table = None  # Precomputed ownership-blind paths, e.g. from a compiled map
+
+    def share_static_paths(self, other: "ShortestPaths"):
+        """Reuse another service's ownership-blind results; only valid for maps with the same routes."""
+        self._static_cache = other._static_cache
+        self._static_table = other._static_table
+
+    def use_static_table(self, table):
+        """
+        Answer ownership-blind queries from a table with a single_source(source) method and a shared
+        static_paths cache, such as a CompiledMap, instead of running Dijkstra.
+        """
+        self._static_cache = table.static_paths
+        self._static_table = table
+
+    def _single_source(self, source: str, player_id: Optional[int]):
+        if player_id is None:
+            result = self._static_cache.get(source)
+            if result is None:
+                if self._static_table is not None:
+                    result = self._static_table.single_source(source)
+                else:
+                    result = self._static_cache[source] = dijkstra(self.game_map.city_routes, source)
+            return result
+
+        if self._claim_version != self.game_map.claim_version:
+            self._cache.clear()
+            self._claim_version = self.game_map.claim_version
+
+        key = (player_id, source)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._cache[key] = dijkstra(self.game_map.city_routes, source, player_id)
+        return result
+
+    def distances(self, source: str, player_id: Optional[int] = None) -> Dict[str, int]:
+        """
+        Distances from source to every reachable city. With a player_id, routes owned by other
+        players are excluded; without one, every route is usable. The result is shared, do not modify it.
+        """
+        return self._single_source(source, player_id)[0]
+
+    def distance(self, city1: str, city2: str, player_id: Optional[int] = None) -> Optional[int]:
+        """Shortest distance in trains between two cities, or None if they cannot be connected."""
+        return self._single_source(city1, player_id)[0].get(city2)
+
+    def path(self, city1: str, city2: str, player_id: Optional[int] = None) -> List[str]:
+        """Cities along the shortest path from city1 to city2, or an empty list if there is none."""
+        distances, previous = self._single_source(city1, player_id)
+        if city2 not in distances:
+            return []
+
+        path = []
+        current = city2
+        while current is not None:
+            path.append(current)
+            current = previous[current]
+        return list(reversed(path))
@@ -0,0 +1,177 @@
+import importlib
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, asdict
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Functions whose calls are counted by default, as "module:attribute" with an optional class prefix
+DEFAULT_COUNTED = (
+    "game.hand:Hand.can_afford",
+    "game.map:TicketToRideMap.get_component_labels",
+    "game.map:TicketToRideMap.are_tickets_completed",
+    "game.agent:TicketToRideAI._find_best_path",
+    "game.legal_moves:LegalMoves.refresh",
+)
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    wall: float = 0.0  # Seconds, including nested phases
+    cpu: float = 0.0  # Seconds of process CPU time, including nested phases
+
+
+class _Phase:
+    """Times one entry into a phase and records it under the current stack of phases."""
+    __slots__ = ("profiler", "name", "wall", "cpu")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._stack.append(self.name)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        stack = self.profiler._stack
+        stats = self.profiler.phases.get(tuple(stack))
+        if stats is None:
+            stats = self.profiler.phases[tuple(stack)] = PhaseStats()
+        stats.calls += 1
+        stats.wall += wall
+        stats.cpu += cpu
+        stack.pop()
+
+
+class _NullPhase:
+    """Stands in for a phase when no profiler is active."""
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+_active: Optional["Profiler"] = None
+
+
+def phase(name: str):
+    """
+    Context manager timing a phase of the game loop under the active profiler.
+    Without an active profiler it returns a shared no-op context, so instrumented code pays only for the call.
+    """
+    return _NULL_PHASE if _active is None else _active.phase(name)
+
+
+def _resolve(target: str):
+    """Find the object owning a "module:Class.attribute" or "module:function" target and the attribute name."""
+    module_name, _, path = target.partition(":")
+    owner = importlib.import_module(module_name)
+    *owners, attribute = path.split(".")
+    for name in owners:
+        owner = getattr(owner, name)
+    return owner, attribute
+
+
+class Profiler:
+    """
+    Records wall and CPU time per phase of the game loop and counts calls to hot functions.
+
+    Use it as a context manager around the code to profile. While active, every `phase(name)` block is
+    timed under the stack of enclosing phases, and the counted functions are wrapped with call counters.
+    On exit the original functions are put back, so code run without a profiler is not slowed down.
+    """
+
+    def __init__(self, counted: Sequence[str] = DEFAULT_COUNTED):
+        self.counted = list(counted)
+        self.phases: Dict[Tuple[str, ...], PhaseStats] = {}
+        self.calls: Counter = Counter()
+        self._stack: List[str] = []
+        self._originals: List[Tuple[object, str, object]] = []
+
+    def __enter__(self) -> "Profiler":
+        global _active
+        if _active is not None:
+            raise RuntimeError("Another profiler is already active")
+        for target in self.counted:
+            owner, attribute = _resolve(target)
+            original = getattr(owner, attribute)
+            self._originals.append((owner, attribute, original))
+            setattr(owner, attribute, self._counting(target, original))
+            self.calls[target] += 0  # List functions that are never called too
+        _active = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active
+        _active = None
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals.clear()
+
+    def _counting(self, name: str, func):
+        calls = self.calls
+
+        @wraps(func)
+        def counted(*args, **kwargs):
+            calls[name] += 1
+            return func(*args, **kwargs)
+        return counted
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def to_dict(self) -> dict:
+        return {
+            "phases": [{"stack": list(stack), **asdict(stats)} for stack, stats in self.phases.items()],
+            "calls": dict(self.calls),
+        }
+
+    def save_json(self, filename: str):
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def collapsed_stacks(self, cpu: bool = False) -> List[str]:
+        """
+        One "outer;inner value" line per stack of phases, the format flamegraph tools read.
+        Values are the microseconds spent in the phase itself, excluding nested phases.
+        """
+        totals = {stack: stats.cpu if cpu else stats.wall for stack, stats in self.phases.items()}
+        self_times = dict(totals)
+        for stack, total in totals.items():
+            if len(stack) > 1 and stack[:-1] in self_times:
+                self_times[stack[:-1]] -= total
+        return [f"{';'.join(stack)} {max(0, round(value * 1e6))}" for stack, value in self_times.items()]
+
+    def save_collapsed(self, filename: str, cpu: bool = False):
+        with open(filename, "w") as f:
+            f.write("\n".join(self.collapsed_stacks(cpu)) + "\n")
+
+    def print_summary(self):
+        print(f"{'phase':<40}{'calls':>10}{'wall (s)':>12}{'cpu (s)':>12}")
+        for stack, stats in sorted(self.phases.items()):
+            name = "  " * (len(stack) - 1) + stack[-1]
+            print(f"{name:<40}{stats.calls:>10}{stats.wall:>12.4f}{stats.cpu:>12.4f}")
+        for name, count in self.calls.most_common():
+            print(f"{name:<62}{count:>12}")
+
+
+if __name__ == "__main__":
+    from game.simulation import simulate_game
+
+    with Profiler() as profiler:
+        for seed in range(100):
+            with phase("game"):
+                simulate_game(seed)
+    profiler.print_summary()
+    profiler.save_json("profile.json")
+    profiler.save_collapsed("profile.folded")
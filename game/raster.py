@@ -0,0 +1,82 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import cairosvg
+from PIL import Image, ImageColor
+
+from game.backends import RenderBackend, get_backend
+from game.gif import StreamingGifWriter
+from game.render import FRAME_COLORS
+
+
+def rasterize_svg(svg_file: str) -> bytes:
+    """Convert an SVG file to PNG bytes. Defined at module level so worker processes can run it."""
+    return cairosvg.svg2png(url=svg_file)
+
+
+class PngBackend(RenderBackend):
+    """PNG images, rasterized from the SVG backend's output with cairosvg."""
+    name = "png"
+    extension = "png"
+    binary = True
+
+    def render(self, game_map, width: int = 800, height: int = 600, turn_number: int = None,
+               player_hands=None, current_player: int = None, face_up_cards=None) -> bytes:
+        svg = get_backend("svg").render(game_map, width, height, turn_number, player_hands,
+                                        current_player, face_up_cards)
+        return cairosvg.svg2png(bytestring=svg.encode())
+
+
+def create_game_gif(svg_files: List[str], output_file: str = "game_replay.gif", duration: int = 200,
+                    workers: int = None, deltas: bool = True):
+    """
+    Create a GIF from a series of SVG files, with each frame lasting for the specified duration.
+    Frames are rasterized in parallel worker processes and streamed into the GIF as they arrive,
+    so only a few frames are in memory at a time and no temporary files are written.
+
+    Args:
+        svg_files: List of SVG filenames
+        output_file: Output GIF filename
+        duration: Duration for each frame in milliseconds
+        workers: Number of rasterization processes, defaults to one per CPU
+        deltas: Whether to only store the part of each frame that changed since the previous one
+    """
+    print("\nGenerating game replay GIF...")
+    print("[", end="", flush=True)
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            StreamingGifWriter(output_file, duration=duration, deltas=deltas,
+                               colors=[ImageColor.getrgb(color) for color in FRAME_COLORS]) as writer:
+        png_frames = _rasterize_in_order(executor, svg_files, window=2 * workers)
+        for frame in _decode_frames(png_frames, len(svg_files)):
+            writer.add_frame(frame)
+
+    print(f"\nGame replay saved as {output_file}")
+
+
+def _rasterize_in_order(executor, svg_files: List[str], window: int):
+    """Yield PNG bytes for each SVG file in order, with at most `window` frames in flight."""
+    pending = deque()
+    for svg_file in svg_files:
+        pending.append(executor.submit(rasterize_svg, svg_file))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _decode_frames(png_frames, total: int):
+    """Decode PNG bytes into images, printing a progress bar as frames arrive."""
+    for i, png_data in enumerate(png_frames):
+        yield Image.open(io.BytesIO(png_data))
+
+        # Print progress bar
+        progress = (i + 1) / total
+        bar_width = 40
+        position = int(progress * bar_width)
+        print("\r[" + "=" * position + ">" + " " * (bar_width - position - 1) + "]" +
+              f" {int(progress * 100)}%", end="", flush=True)
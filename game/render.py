@@ -0,0 +1,334 @@
+import math
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple
+
+from game.utils import Route, City, CardColor
+
+# GREY routes are solid gray, only WILD routes are striped
+COLOR_MAP = {
+    CardColor.RED: "#F44336",
+    CardColor.BLUE: "#2196F3",
+    CardColor.GREEN: "#4CAF50",
+    CardColor.YELLOW: "#FFC107",
+    CardColor.BLACK: "#212121",
+    CardColor.WHITE: "#FAFAFA",
+    CardColor.ORANGE: "#FF9800",
+    CardColor.PINK: "#E91E63",
+    CardColor.WILD: "url(#wildPattern)",  # Striped pattern for wild only
+    CardColor.GREY: "#757575"  # Solid gray for grey routes
+}
+
+# Players are drawn in the color with the same position in CardColor as their id
+PLAYER_COLORS = [COLOR_MAP[color] for color in CardColor]
+# Every solid color the renderer draws with, so raster formats can keep them exact
+FRAME_COLORS = [color for color in COLOR_MAP.values() if color.startswith("#")] + [
+    "#f0f0f0", "#9E9E9E", "#006400", "#8B0000", "#808080", "#FFFFFF", "#000000"
+]
+CAR_HEIGHT = 12
+
+
+@dataclass
+class RouteGeometry:
+    """Position of a route on the rendered map."""
+    x: float
+    y: float
+    mid_x: float
+    mid_y: float
+    angle: float
+    length: float
+
+
+@dataclass
+class StaticLayer:
+    """Pre-rendered parts of the map that do not change during a game, for one layout size."""
+    base_height: int
+    background: str  # Document header, definitions and background
+    tracks: str  # Unclaimed track of every route
+    labels: str  # Route lengths and cities, drawn above the trains
+    geometry: List[RouteGeometry]
+
+
+class SvgRenderer:
+    """
+    Renders a map and game state as SVG in layers.
+
+    The static layer (background, route tracks and lengths, cities) is built once per layout size
+    and cached, as are the train cars drawn on each claimed route. A frame only renders the parts
+    that change from turn to turn: face-up cards, the turn number and the player sections.
+    """
+
+    def __init__(self, game_map):
+        self.map = game_map
+        self._static_layers: Dict[Tuple[int, int], StaticLayer] = {}
+        # (route index, owner, width, height) -> train cars on that route
+        self._car_fragments: Dict[Tuple[int, int, int, int], str] = {}
+
+    def render(self, width: int = 800, height: int = 600, turn_number: int = None,
+               player_hands=None, current_player: int = None, face_up_cards=None) -> str:
+        layer = self._get_static_layer(width, height)
+
+        svg_elements = [layer.background]
+
+        # Draw map elements
+        self._draw_face_up_cards(svg_elements, face_up_cards, width)
+        self._draw_turn_number(svg_elements, turn_number, width)
+
+        # Draw routes, claimed trains and cities
+        svg_elements.append(layer.tracks)
+        for index, route in enumerate(self.map.routes):
+            if route.claimed_by is not None:
+                svg_elements.append(self._get_train_cars(index, route, layer, width, height))
+        svg_elements.append(layer.labels)
+
+        # Draw player sections
+        if player_hands:
+            self._draw_player_sections(svg_elements, player_hands, current_player,
+                                       width, layer.base_height)
+
+        svg_elements.append('</svg>')
+        return '\n'.join(svg_elements)
+
+    def _get_static_layer(self, width: int, height: int) -> StaticLayer:
+        """Build the static layer for a layout size, or return the cached one."""
+        key = (width, height)
+        layer = self._static_layers.get(key)
+        if layer is not None:
+            return layer
+
+        base_height, map_height, total_height = self._get_svg_dimensions(width, height)
+        transform_coord = self._get_coordinate_transformer(width, map_height)
+
+        background = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            f'<svg viewBox="0 0 {width} {total_height}" xmlns="http://www.w3.org/2000/svg">',
+            self._get_svg_defs(),
+            f'<rect width="{width}" height="{total_height}" fill="#f0f0f0"/>'
+        ]
+        geometry = [self._get_route_geometry(route, transform_coord) for route in self.map.routes]
+        tracks, labels = [], []
+        for route, route_geometry in zip(self.map.routes, geometry):
+            self._draw_route_track(route, route_geometry, tracks)
+            self._draw_route_length(route, route_geometry, labels)
+        for name, city in self.map.cities.items():
+            self._draw_city(city, name, transform_coord, labels)
+
+        layer = StaticLayer(base_height, '\n'.join(background), '\n'.join(tracks), '\n'.join(labels), geometry)
+        self._static_layers[key] = layer
+        return layer
+
+    def _get_route_geometry(self, route: Route, transform_coord: Callable) -> RouteGeometry:
+        """Work out where a route starts, its direction and its length on screen."""
+        city1, city2 = self.map.cities[route.city1], self.map.cities[route.city2]
+        x1, y1 = transform_coord(city1.x, city1.y)
+        x2, y2 = transform_coord(city2.x, city2.y)
+
+        dx, dy = x2 - x1, y2 - y1
+        length = (dx * dx + dy * dy) ** 0.5
+        angle = math.atan2(dy, dx) * 180 / math.pi
+        return RouteGeometry(x1, y1, (x1 + x2) / 2, (y1 + y2) / 2, angle, length)
+
+    def _draw_route_track(self, route: Route, geometry: RouteGeometry, svg_elements: list):
+        """Draw the faded track of a route."""
+        # Use slightly darker gray for GREY routes to make them more visible
+        color = "#757575" if route.color == CardColor.GREY else COLOR_MAP.get(route.color, "#9E9E9E")
+        svg_elements.append(
+            f'<g transform="translate({geometry.x},{geometry.y}) rotate({geometry.angle})">'
+            f'<line x1="0" y1="0" x2="{geometry.length}" y2="0" '
+            f'stroke="{color}" stroke-width="{CAR_HEIGHT}" stroke-opacity="0.2"/></g>'
+        )
+
+    def _get_train_cars(self, index: int, route: Route, layer: StaticLayer, width: int, height: int) -> str:
+        """Train cars of the player who claimed a route, cached per route, owner and layout size."""
+        key = (index, route.claimed_by, width, height)
+        fragment = self._car_fragments.get(key)
+        if fragment is None:
+            geometry = layer.geometry[index]
+            segment_length = geometry.length / route.length
+            car_width = segment_length * 0.8
+            player_color = PLAYER_COLORS[route.claimed_by]
+
+            svg_elements = [f'<g transform="translate({geometry.x},{geometry.y}) rotate({geometry.angle})">']
+            for i in range(route.length):
+                x_offset = i * segment_length
+                # Draw train car
+                svg_elements.append(
+                    f'<rect x="{x_offset}" y="{-CAR_HEIGHT / 2}" '
+                    f'width="{car_width}" height="{CAR_HEIGHT}" '
+                    f'fill="{player_color}" rx="2"/>'
+                )
+                # Draw wheels
+                for wheel_pos in [0.25, 0.75]:
+                    svg_elements.append(
+                        f'<circle cx="{x_offset + car_width * wheel_pos}" '
+                        f'cy="{CAR_HEIGHT / 2 - 1}" r="{CAR_HEIGHT / 4}" fill="black"/>'
+                    )
+            svg_elements.append('</g>')
+            fragment = self._car_fragments[key] = '\n'.join(svg_elements)
+        return fragment
+
+    def _draw_route_length(self, route: Route, geometry: RouteGeometry, svg_elements: list):
+        """Draw the length of a route next to its middle."""
+        text_offset = 15
+        angle = math.radians(geometry.angle)
+        text_x = geometry.mid_x + text_offset * math.sin(angle)
+        text_y = geometry.mid_y - text_offset * math.cos(angle)
+
+        # Draw route length with outline
+        for stroke in [True, False]:
+            attrs = 'stroke="white" stroke-width="2" stroke-linejoin="round"' if stroke else 'fill="black"'
+            svg_elements.append(
+                f'<text x="{text_x}" y="{text_y}" '
+                f'font-size="14" font-weight="bold" text-anchor="middle" '
+                f'{attrs}>{route.length}</text>'
+            )
+
+    def _get_svg_dimensions(self, width: int, height: int) -> Tuple[int, int, int]:
+        """Calculate dimensions for SVG rendering."""
+        player_section_height = 250
+        header_height = 100  # Increased from 50 to 100
+        map_height = height - header_height
+        total_height = height + player_section_height
+        return height, map_height, total_height
+
+    def _get_coordinate_transformer(self, width: int, map_height: int) -> callable:
+        """Create coordinate transformation function with current scaling."""
+        x_values = [city.x for city in self.map.cities.values()]
+        y_values = [city.y for city in self.map.cities.values()]
+        min_x, max_x = min(x_values), max(x_values)
+        min_y, max_y = min(y_values), max(y_values)
+
+        # Scale to 90% of width/height to leave margin
+        viewport_width = width * 0.9
+        viewport_height = map_height * 0.9
+
+        scale_x = viewport_width / (max_x - min_x)
+        scale_y = viewport_height / (max_y - min_y)
+        scale = min(scale_x, scale_y)
+
+        def transform_coordinate(x: float, y: float) -> tuple[float, float]:
+            """Transform coordinates to fit map exactly in viewport"""
+            scaled_width = (max_x - min_x) * scale
+            scaled_height = (max_y - min_y) * scale
+            # Center the map horizontally and add more vertical offset
+            x_offset = (width - scaled_width) / 2
+            y_offset = 100  # Match the new header_height value
+            return (
+                (x - min_x) * scale + x_offset,
+                (y - min_y) * scale + y_offset
+            )
+
+        return transform_coordinate
+
+    def _get_svg_defs(self) -> str:
+        """Get SVG definitions including patterns."""
+        return '''<defs>
+            <pattern id="wildPattern" patternUnits="userSpaceOnUse" width="10" height="10">
+                <rect width="10" height="10" fill="white"/>
+                <path d="M-1,1 l2,-2 M0,10 l10,-10 M9,11 l2,-2" stroke="black" stroke-width="2"/>
+            </pattern>
+        </defs>'''
+
+    def _draw_face_up_cards(self, svg_elements: list, face_up_cards: list, width: int):
+        """Draw the face-up cards at the top of the display."""
+        if not face_up_cards:
+            return
+
+        card_width = 30
+        card_height = 45
+        card_gap = 5
+        start_x = width - 20 - (5 * (card_width + card_gap))
+        cards_y = 20
+
+        for i, card in enumerate(face_up_cards):
+            x = start_x + i * (card_width + card_gap)
+            card_color = COLOR_MAP.get(card, "#9E9E9E")
+            svg_elements.append(
+                f'<rect x="{x}" y="{cards_y}" width="{card_width}" height="{card_height}" '
+                f'fill="{card_color}" stroke="black" stroke-width="1" rx="2"/>'
+            )
+
+    def _draw_turn_number(self, svg_elements: list, turn_number: int, width: int):
+        """Draw the turn number indicator."""
+        if turn_number is None:
+            return
+
+        # Position the turn number at the top left
+        svg_elements.extend([
+            f'<text x="20" y="40" font-size="24" font-weight="bold" '
+            f'stroke="white" stroke-width="3" stroke-linejoin="round" text-anchor="start">Turn {turn_number}</text>',
+            f'<text x="20" y="40" font-size="24" font-weight="bold" '
+            f'fill="black" text-anchor="start">Turn {turn_number}</text>'
+        ])
+
+    def _draw_city(self, city: City, name: str, transform_coord: callable, svg_elements: list):
+        """Draw a city and its name."""
+        x, y = transform_coord(city.x, city.y)
+        svg_elements.append(
+            f'<circle cx="{x}" cy="{y}" r="8" '
+            f'fill="white" stroke="black" stroke-width="2"/>'
+        )
+        svg_elements.append(
+            f'<text x="{x}" y="{y - 12}" '
+            f'font-size="12" font-weight="bold" text-anchor="middle" '
+            f'stroke="white" stroke-width="3" stroke-linejoin="round">{name}</text>'
+        )
+        svg_elements.append(
+            f'<text x="{x}" y="{y - 12}" '
+            f'font-size="12" font-weight="bold" text-anchor="middle" '
+            f'fill="black">{name}</text>'
+        )
+
+    def _draw_player_sections(self, svg_elements: list, player_hands: dict, current_player: int, width: int, base_height: int):
+        """Draw the player sections at the bottom."""
+        section_width = width / len(player_hands)
+        card_width = 20
+        card_height = 30
+        cards_y = base_height + 30
+        cards_per_row = int((section_width - 40) / (card_width + 5))
+
+        for player_id, hand in player_hands.items():
+            section_x = player_id * section_width
+
+            # Draw player header
+            font_weight = "900" if player_id == current_player else "normal"
+            player_color = PLAYER_COLORS[player_id]
+            svg_elements.append(
+                f'<text x="{section_x + section_width / 2}" y="{base_height + 20}" '
+                f'font-size="16" font-weight="{font_weight}" text-anchor="middle" '
+                f'fill="{player_color}">Player {player_id} ({hand.get("points", 0)}pts)</text>'
+            )
+
+            # Draw cards
+            cards = hand.get('cards', [])
+            for i, card in enumerate(cards):
+                row = i // cards_per_row
+                col = i % cards_per_row
+                x = section_x + 10 + (col * (card_width + 5))
+                y = cards_y + (row * (card_height + 5))
+                svg_elements.append(
+                    f'<rect x="{x}" y="{y}" width="{card_width}" height="{card_height}" '
+                    f'fill="{COLOR_MAP.get(card, "#9E9E9E")}" stroke="black" stroke-width="1" rx="2"/>'
+                )
+
+            # Calculate vertical position for destination tickets
+            tickets_y = cards_y + ((len(hand.get('cards', [])) - 1) // cards_per_row + 2) * (card_height + 5)
+
+            # Draw destination tickets
+            if 'destination_tickets' in hand and hand['destination_tickets']:
+                svg_elements.append(
+                    f'<text x="{section_x + 10}" y="{tickets_y}" '
+                    f'font-size="12" font-weight="bold" fill="black">Destination Tickets:</text>'
+                )
+                completed = self.map.are_tickets_completed(player_id, hand['destination_tickets'])
+                for i, (ticket, is_completed) in enumerate(zip(hand['destination_tickets'], completed)):
+                    text_color = "#006400" if is_completed else "#8B0000"  # Dark green if completed, dark red if not
+                    svg_elements.append(
+                        f'<text x="{section_x + 20}" y="{tickets_y + (i + 1) * 20}" '
+                        f'font-size="12" fill="{text_color}">'
+                        f'{ticket.city1} -> {ticket.city2} ({ticket.points} points)</text>'
+                    )
+            else:
+                svg_elements.append(
+                    f'<text x="{section_x + 10}" y="{tickets_y}" '
+                    f'font-size="12" fill="gray">No destination tickets</text>'
+                )
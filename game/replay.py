@@ -0,0 +1,141 @@
+import os
+import random
+from typing import Callable, Iterable, Iterator, List
+
+from game.backends import get_backend
+from game.events import (EventLog, Event, map_checksum, unpack_ticket_choice,
+                         DRAW_DECK, DRAW_FACE_UP, CLAIM_ROUTE, CLAIM_ROUTE_PAID, KEEP_TICKETS, END_TURN, END_SETUP,
+                         KEYFRAME)
+from game.hand import CARD_COLORS
+from game.map import TicketToRideMap
+from game.state import GameSnapshot, GameState
+
+
+def _frame_arguments(game: GameState, current_player: int) -> dict:
+    return dict(
+        turn_number=game.turn_number,
+        player_hands={i: {
+            'cards': data['hand'],
+            'points': data['points'],
+            'destination_tickets': data['destination_tickets']
+        } for i, data in game.players.items()},
+        current_player=current_player,
+        face_up_cards=game.face_up_cards
+    )
+
+
+def render_game(game: GameState, current_player: int, backend: str = "svg"):
+    """Render the board, face-up cards and every player's hand for the turn that was just played."""
+    return get_backend(backend).render(game.map, **_frame_arguments(game, current_player))
+
+
+def render_game_svg(game: GameState, current_player: int) -> str:
+    return render_game(game, current_player, "svg")
+
+
+class GameReplay:
+    """
+    Rebuilds a recorded game from its event log.
+
+    Seeking to a turn restores the nearest keyframe at or before it and applies the recorded decisions
+    after it through the same GameState methods the live game used. Requests for later turns continue
+    from the current position when that is closer than the next keyframe, so walking through a game in
+    order replays every event once.
+    """
+
+    def __init__(self, log: EventLog, map_factory: Callable[[], TicketToRideMap] = TicketToRideMap):
+        self.log = log
+        self.num_turns = log.num_turns
+        game_map = map_factory()
+        if map_checksum(game_map) != log.checksum:
+            raise ValueError("Event log was recorded on a different map")
+        self.game = GameState(game_map, log.num_players, rng=random.Random(log.seed))
+        self._events: Iterator[Event] = log.events()
+        self._completed = -1  # Turns completed so far, -1 while the initial deal is still being replayed
+        self._last_player = 0  # Player who made the last completed turn
+
+    def _seek(self, turn: int):
+        """Move to the nearest keyframe at or before the turn, or to the start without keyframes."""
+        keyframe = self.log.nearest_keyframe(turn)
+        if keyframe is None:
+            game_map = self.game.map
+            game_map.set_route_owners((None,) * len(game_map.routes))
+            game_map.drawn_tickets.clear()
+            self.game = GameState(game_map, self.log.num_players, rng=random.Random(self.log.seed))
+            self._events = self.log.events()
+            self._completed = -1
+            self._last_player = 0
+            return
+
+        keyframe_turn, offset = keyframe
+        self._events = self.log.events(offset)
+        event = next(self._events)
+        self.game.restore(GameSnapshot.decode(event.values, self.game.map, keyframe_turn))
+        self._completed = keyframe_turn
+        self._last_player = event.player_id
+
+    def _apply(self, event: Event):
+        game = self.game
+        if event.kind == DRAW_DECK:
+            game.draw_train_card(event.player_id)
+        elif event.kind == DRAW_FACE_UP:
+            game.draw_train_card(event.player_id, event.argument)
+        elif event.kind in (CLAIM_ROUTE, CLAIM_ROUTE_PAID):
+            cards = [CARD_COLORS[i] for i in event.values] if event.kind == CLAIM_ROUTE_PAID else None
+            if not game.claim_route(event.player_id, game.map.routes[event.argument], cards):
+                raise ValueError(f"Recorded claim of route {event.argument} is not legal on replay")
+        elif event.kind == KEEP_TICKETS:
+            _, kept_indices = unpack_ticket_choice(event.argument)
+            tickets = [game.map.destination_tickets[i] for i in event.values]
+            game.map.drawn_tickets.extend(tickets)
+            game.keep_tickets(event.player_id, tickets, [tickets[i] for i in kept_indices])
+        elif event.kind == END_TURN:
+            game.check_end_game_condition(event.player_id)
+            game.turn_number += 1
+            self._completed += 1
+            self._last_player = event.player_id
+        elif event.kind == END_SETUP:
+            self._completed = 0
+        elif event.kind != KEYFRAME:
+            raise ValueError(f"Unknown event kind {event.kind}")
+
+    def state_at(self, turn: int) -> GameState:
+        """
+        The game after the given number of turns, 0 being the end of the initial deal.
+        The returned state is reused by the replay, clone it to keep it.
+        """
+        if not 0 <= turn <= self.num_turns:
+            raise ValueError(f"Turn {turn} is outside the recorded game of {self.num_turns} turns")
+        keyframe = self.log.nearest_keyframe(turn)
+        if self._completed > turn or (keyframe is not None and keyframe[0] > self._completed):
+            self._seek(turn)
+
+        # Apply events up to and including the one that completes the requested turn
+        while self._completed < turn:
+            self._apply(next(self._events))
+        return self.game
+
+    def final_state(self) -> GameState:
+        return self.state_at(self.num_turns)
+
+    def render(self, turn: int, backend: str = "svg"):
+        """Render the frame shown after the given turn, as the live game does, with any backend."""
+        game = self.state_at(turn)
+        return render_game(game, self._last_player, backend)
+
+    def render_svg(self, turn: int) -> str:
+        return self.render(turn, "svg")
+
+    def render_frames(self, turns: Iterable[int], frames_dir: str, backend: str = "svg") -> List[str]:
+        """Write frames for the given turns only and return their filenames."""
+        os.makedirs(frames_dir, exist_ok=True)
+        renderer = get_backend(backend)
+        filenames = []
+        for turn in sorted(turns):
+            filename = os.path.join(frames_dir, f"game_state_turn_{turn}")
+            if renderer.extension:
+                filename += f".{renderer.extension}"
+            game = self.state_at(turn)
+            renderer.write(filename, game.map, **_frame_arguments(game, self._last_player))
+            filenames.append(filename)
+        return filenames
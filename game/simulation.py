@@ -0,0 +1,237 @@
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from game.actions import Action, CARDS_PER_DRAW, ClaimRoute, DrawCards, DrawTickets
+from game.agent import TicketToRideAI
+from game.deadlines import FALLBACK_ACTION, MoveTimer
+from game.events import EventLog, DEFAULT_KEYFRAME_INTERVAL
+from game.map import TicketToRideMap
+from game.profiling import phase
+from game.state import GameState, STARTING_CARDS
+from game.utils import DestinationTicket
+
+
+@dataclass
+class GameResult:
+    """Compact summary of a finished game."""
+    seed: Optional[int]
+    scores: Dict[int, int]  # Final scores including destination ticket bonuses/penalties
+    route_points: Dict[int, int]  # Points from claimed routes only
+    winner: Optional[int]  # None if the game ended in a tie
+    turns: int
+    ticket_outcomes: Dict[int, List[Tuple[DestinationTicket, bool]]]
+    event_log: Optional[EventLog] = None  # Set when the game was recorded
+    move_timer: Optional[MoveTimer] = None  # Decision timing, set when the game had a per-move budget
+
+
+def setup_game(game: GameState, log: Optional[Callable[[str], None]] = None):
+    """Deal each player their starting cards and destination tickets."""
+    for player in game.players:
+        for _ in range(STARTING_CARDS):
+            card = game.draw_train_card(player)
+            if card and log:
+                log(f"Player {player} drew a {card.value} card")
+        # Initial destination ticket selection
+        game.initial_ticket_selection(player)
+    if game.event_log is not None:
+        game.event_log.end_setup()
+        game.log_keyframe()
+
+
+def is_game_over(game: GameState, max_turns: int) -> bool:
+    """Check for the max turns limit or an empty deck."""
+    return game.turn_number >= max_turns or (len(game.train_deck) == 0 and len(game.face_up_cards) == 0)
+
+
+def _legacy_action(game: GameState, player_id: int, name: str) -> Optional[Action]:
+    """
+    Convert an action name from the old string protocol. A claim takes the first unclaimed route the
+    player can afford, as the engine used to, and is None if there is none.
+    """
+    if name == 'claim_route':
+        route = game.legal_moves.first(player_id)
+        if route is None:
+            return None
+        return ClaimRoute(route, tuple(game.players[player_id]["hand"].payment(route)))
+    if name == 'draw_tickets':
+        return DrawTickets()
+    return DrawCards()
+
+
+def apply_action(game: GameState, player_id: int, action: Action,
+                 log: Optional[Callable[[str], None]] = None) -> bool:
+    """
+    Apply an agent's action after a cheap legality check.
+    Returns False, leaving the game unchanged, if the action is not legal.
+    """
+    if isinstance(action, DrawCards):
+        with phase("card_draw"):
+            face_up_indices = action.face_up_indices
+            for i in range(CARDS_PER_DRAW):
+                card = game.draw_train_card(player_id, face_up_indices[i] if i < len(face_up_indices) else None)
+                if card and log:
+                    log(f"Player {player_id} drew a {card.value} card")
+        return True
+
+    if isinstance(action, ClaimRoute):
+        route = action.route
+        with phase("route_claim"):
+            # The route must be on this map; the game checks the player has the trains for it and the
+            # map that it is unclaimed and that the cards pay for it
+            if route not in game.map.route_index or not game.claim_route(player_id, route, action.cards):
+                return False
+        if log:
+            log(f"Player {player_id} claimed route: {route.city1} to {route.city2}")
+        return True
+
+    if isinstance(action, DrawTickets):
+        # Player draws 3 destination tickets and keeps at least 1
+        with phase("ticket_draw"):
+            game.draw_destination_tickets(player_id)
+            if log:
+                log(f"Player {player_id} drew new destination tickets")
+        return True
+
+    raise TypeError(f"Unknown action {action!r}")
+
+
+def play_turn(game: GameState, player_id: int, log: Optional[Callable[[str], None]] = None):
+    """
+    Let a player's agent choose an action and apply it to the game.
+    Agents return a typed action (see game.actions); the old action names are still accepted.
+    Messages are only formatted when a log function is given.
+    Returns the action chosen by the agent, or the fallback action if it returned after the game's
+    move deadline; the agent is not interrupted, so the deadline only bounds agents that honour it.
+    """
+    ai = game.players[player_id]['ai_agent']
+    ai.set_face_up_cards(game.face_up_cards)  # Update AI with current face-up cards
+    timer = game.move_timer
+    with phase("agent_decision"):
+        if timer is None:
+            action = ai.choose_action()
+        else:
+            deadline = timer.start(ai)
+            action = ai.choose_action()
+            if not timer.finish(ai, deadline, player_id):
+                action = FALLBACK_ACTION
+                if log:
+                    log(f"Player {player_id} ran out of time and draws cards instead")
+
+    take_action(game, player_id, action, log)
+    return action
+
+
+def take_action(game: GameState, player_id: int, action, log: Optional[Callable[[str], None]] = None):
+    """
+    Play a player's turn with the given action, typed or an old action name: apply it, or draw a
+    single card if it can't be made, then check for the end of the game and close the turn in the event log.
+    """
+    typed_action = _legacy_action(game, player_id, action) if isinstance(action, str) else action
+    if typed_action is None or not apply_action(game, player_id, typed_action, log):
+        # A claim that can't be made draws a single card instead
+        with phase("card_draw"):
+            card = game.draw_train_card(player_id)
+            if card and log:
+                log(f"Player {player_id} drew a {card.value} card")
+
+    # Check for endgame condition after the player's turn
+    if game.check_end_game_condition(player_id) and log:
+        remaining_trains = game.players[player_id]["remaining_trains"]
+        log(f"Player {player_id} has {remaining_trains} trains remaining. Final round begins!")
+
+    if game.event_log is not None:
+        game.event_log.end_turn(player_id)
+        game.log_keyframe()
+
+
+def advance_turn(game: GameState, current_player: int) -> Optional[int]:
+    """Move on from a finished turn: count it and return the next player, or None if the final round is over."""
+    game.turn_number += 1
+    current_player = (current_player + 1) % len(game.players)
+    if game.final_round and current_player == game.last_turn_player:
+        return None
+    return current_player
+
+
+def play_out(game: GameState, current_player: Optional[int], max_turns: int, record: Optional[list] = None,
+             log: Optional[Callable[[str], None]] = None, before_turn: Optional[Callable[[int], None]] = None,
+             after_turn: Optional[Callable[[int], None]] = None) -> Optional[int]:
+    """
+    Play turns, starting with current_player, until the game ends; None means the final round is over.
+    The game loop of both simulate_game and the interactive play_game: before_turn is called with the
+    player about to move, before checking whether the game is over, and after_turn with the player who
+    just moved, once the turn has been counted. Returns the player who would move next when the turn
+    limit or an empty deck stopped the game, or None once the final round is over.
+    """
+    while current_player is not None:
+        if before_turn is not None:
+            before_turn(current_player)
+        if is_game_over(game, max_turns):
+            if log:
+                log(f"Game over - {'maximum turns reached' if game.turn_number >= max_turns else 'deck exhausted'}!")
+            return current_player
+        with phase("turn"):
+            action = play_turn(game, current_player, log)
+        if record is not None:
+            record.append((game.turn_number, current_player, action))
+        player_id, current_player = current_player, advance_turn(game, current_player)
+        if after_turn is not None:
+            after_turn(player_id)
+    if log:
+        log("Final round completed. Game over!")
+    return None
+
+
+def simulate_game(seed: Optional[int] = None, agents: Optional[Sequence[Callable]] = None,
+                  num_players: int = 2, max_turns: int = 80, record: Optional[list] = None,
+                  log_events: bool = False, keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+                  map_factory: Callable[[], TicketToRideMap] = TicketToRideMap,
+                  move_time_ms: Optional[float] = None) -> GameResult:
+    """
+    Play a full game without console output, rendering or filesystem access.
+
+    Args:
+        seed: Seed for this game's own random number generator
+        agents: One agent factory per player, called as factory(player_state, game_map).
+            Defaults to TicketToRideAI for each of num_players players.
+        num_players: Number of players when agents is not given
+        max_turns: Maximum number of turns before the game is stopped
+        record: Optional list that receives a (turn_number, player_id, action) tuple per turn
+        log_events: Record the game in an EventLog returned with the result, picking a seed if none is given
+        keyframe_interval: Turns between full-state keyframes in the event log, 0 for none
+        map_factory: Creates the board, the basic US map by default
+        move_time_ms: Time budget of every decision, see game.deadlines; None for no limit. Only agents that
+            honour the deadline are bounded by it; late decisions are replaced once they return.
+    """
+    if agents is None:
+        agents = [TicketToRideAI] * num_players
+    num_players = len(agents)
+    if log_events and seed is None:
+        seed = random.randrange(2 ** 64)
+
+    game_map = map_factory()
+    game = GameState(game_map, num_players, rng=random.Random(seed))
+    if log_events:
+        game.event_log = EventLog.for_game(seed, num_players, game_map, keyframe_interval)
+    if move_time_ms is not None:
+        game.move_timer = MoveTimer(move_time_ms)
+    for i, agent_factory in enumerate(agents):
+        game.players[i]['ai_agent'] = agent_factory(game.players[i], game_map)
+
+    setup_game(game)
+    play_out(game, 0, max_turns, record)
+
+    scores = {i: game.final_score(i) for i in game.players}
+    best = max(scores.values())
+    leaders = [i for i, score in scores.items() if score == best]
+    return GameResult(
+        seed=seed,
+        scores=scores,
+        route_points={i: data["points"] for i, data in game.players.items()},
+        winner=leaders[0] if len(leaders) == 1 else None,
+        turns=game.turn_number,
+        ticket_outcomes={i: game.ticket_outcomes(i) for i in game.players},
+        event_log=game.event_log,
+        move_timer=game.move_timer
+    )
@@ -1,100 +1,378 @@
 import random
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
 
+from game.deadlines import MoveTimer
+from game.events import EventLog
+from game.hand import Hand, CARD_COLORS, COLOR_INDEX
+from game.legal_moves import LegalMoves
 from game.map import TicketToRideMap
-from game.utils import CardColor
+from game.utils import CardColor, DestinationTicket, Route
+from game.zobrist import zobrist_keys
+
+# Number of cards of each color in the train deck (GREY is never dealt)
+TRAIN_DECK_DISTRIBUTION = {
+    CardColor.RED: 12,
+    CardColor.BLUE: 12,
+    CardColor.GREEN: 12,
+    CardColor.YELLOW: 12,
+    CardColor.BLACK: 12,
+    CardColor.WHITE: 12,
+    CardColor.ORANGE: 12,
+    CardColor.PINK: 12,
+    CardColor.WILD: 14,
+}
+STARTING_TRAINS = 45
+STARTING_CARDS = 4
+FACE_UP_CARDS = 5
+FINAL_ROUND_TRAINS = 3  # The final round starts when a player has this many trains or fewer
+INITIAL_TICKETS, INITIAL_TICKETS_KEPT = 5, 3  # Tickets offered and kept at the start of the game
+DRAWN_TICKETS, DRAWN_TICKETS_KEPT = 3, 1  # Tickets offered and kept when drawing during the game
+
+
+@dataclass
+class GameSnapshot:
+    """The mutable part of a game, as captured by GameState.snapshot()."""
+    route_owners: Tuple[Optional[int], ...]
+    # Per player: (hand counts, indices of claimed routes in claim order, tickets, remaining trains, points)
+    players: Tuple[Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[DestinationTicket, ...], int, int], ...]
+    train_deck: Tuple[CardColor, ...]
+    face_up_cards: Tuple[CardColor, ...]
+    drawn_tickets: Tuple[DestinationTicket, ...]
+    turn_number: int
+    current_player: int
+    final_round: bool
+    last_turn_player: Optional[int]
+
+    def encode(self, game_map: TicketToRideMap) -> List[int]:
+        """
+        Flatten the snapshot into small non-negative integers for an event log keyframe.
+        Cards are stored as color indices, tickets as indices in the map's ticket list and route
+        owners shifted by one so 0 means unclaimed. The turn number is stored in the log's index instead.
+        """
+        tickets = game_map.destination_tickets
+        values = [len(self.players), self.current_player, int(self.final_round),
+                  0 if self.last_turn_player is None else self.last_turn_player + 1]
+        values += [0 if owner is None else owner + 1 for owner in self.route_owners]
+        for cards in (self.train_deck, self.face_up_cards):
+            values.append(len(cards))
+            values += [COLOR_INDEX[card] for card in cards]
+        values.append(len(self.drawn_tickets))
+        values += [tickets.index(ticket) for ticket in self.drawn_tickets]
+        for counts, claimed, player_tickets, trains, points in self.players:
+            values += counts
+            values.append(len(claimed))
+            values += claimed
+            values.append(len(player_tickets))
+            values += [tickets.index(ticket) for ticket in player_tickets]
+            values += [trains, points]
+        return values
+
+    @classmethod
+    def decode(cls, values: List[int], game_map: TicketToRideMap, turn_number: int) -> "GameSnapshot":
+        """Rebuild a snapshot from the output of encode."""
+        tickets = game_map.destination_tickets
+        position = 0
+
+        def take(count: int) -> List[int]:
+            nonlocal position
+            position += count
+            return values[position - count:position]
+
+        num_players, current_player, final_round, last_turn_player = take(4)
+        route_owners = tuple(None if owner == 0 else owner - 1 for owner in take(len(game_map.routes)))
+        train_deck = tuple(CARD_COLORS[i] for i in take(take(1)[0]))
+        face_up_cards = tuple(CARD_COLORS[i] for i in take(take(1)[0]))
+        drawn_tickets = tuple(tickets[i] for i in take(take(1)[0]))
+        players = []
+        for _ in range(num_players):
+            counts = tuple(take(len(CARD_COLORS)))
+            claimed = tuple(take(take(1)[0]))
+            player_tickets = tuple(tickets[i] for i in take(take(1)[0]))
+            trains, points = take(2)
+            players.append((counts, claimed, player_tickets, trains, points))
+
+        return cls(
+            route_owners=route_owners,
+            players=tuple(players),
+            train_deck=train_deck,
+            face_up_cards=face_up_cards,
+            drawn_tickets=drawn_tickets,
+            turn_number=turn_number,
+            current_player=current_player,
+            final_round=bool(final_round),
+            last_turn_player=None if last_turn_player == 0 else last_turn_player - 1
+        )
 
 
 class GameState:
-    def __init__(self, map_instance: TicketToRideMap, num_players: int):
+    def __init__(self, map_instance: TicketToRideMap, num_players: int, rng: Optional[random.Random] = None):
         self.map = map_instance
+        self.rng = rng if rng is not None else random  # Per-game RNG, falls back to the global one
         self.players = {i: {
             "player_id": i,  # Add player_id to state
-            "hand": [],
+            "hand": Hand(),
             "claimed_routes": [],
             "destination_tickets": [],
-            "remaining_trains": 45,
+            "remaining_trains": STARTING_TRAINS,
             "points": 0
         } for i in range(num_players)}
+        self._link_players()
         self.current_player = 0
         self.turn_number = 0  # Initialize turn number
+        self.zobrist = zobrist_keys(len(self.map.routes), len(self.map.destination_tickets), num_players,
+                                    max(TRAIN_DECK_DISTRIBUTION.values()), sum(TRAIN_DECK_DISTRIBUTION.values()))
         self.train_deck = self._initialize_train_deck()
+        self.hash = self.zobrist.deck[len(self.train_deck)]  # Zobrist hash of the position, see game.zobrist
         self.face_up_cards = []
-        self.draw_face_up_cards(5)  # Initial face-up cards
-        self.drawn_tickets = []  # Track tickets that have been dealt
+        self.draw_face_up_cards(FACE_UP_CARDS)  # Initial face-up cards
         self.final_round = False  # Flag to indicate if final round has started
         self.last_turn_player = None  # Player who triggered the final round
+        self.event_log: Optional[EventLog] = None  # Receives every decision when recording a game
+        self.move_timer: Optional[MoveTimer] = None  # Gives decisions a deadline when moves have a time budget
+
+    def _link_players(self):
+        """
+        Start tracking claimable routes, and give agents the tracker and the game through their
+        player state. Search agents read the game to simulate it, and must only use what the
+        player can see.
+        """
+        self.legal_moves = LegalMoves(self.map, self.players)
+        for player in self.players.values():
+            player["legal_moves"] = self.legal_moves
+            player["game"] = self
+
+    def claimable_routes(self, player_id: int) -> List[Route]:
+        """Unclaimed routes the player can afford, in map order."""
+        return self.legal_moves.routes(player_id)
 
     def _initialize_train_deck(self) -> List[CardColor]:
         """Initialize the deck of train cards with the correct distribution."""
         cards = []
-        # Explicitly list playable colors (excludes GREY)
-        playable_colors = [
-            CardColor.RED,
-            CardColor.BLUE,
-            CardColor.GREEN,
-            CardColor.YELLOW,
-            CardColor.BLACK,
-            CardColor.WHITE,
-            CardColor.ORANGE,
-            CardColor.PINK
-        ]
-
-        # Add 12 of each regular color
-        for color in playable_colors:
-            cards.extend([color] * 12)
-
-        # Add 14 wild cards
-        cards.extend([CardColor.WILD] * 14)
-
-        random.shuffle(cards)
+        for color, count in TRAIN_DECK_DISTRIBUTION.items():
+            cards.extend([color] * count)
+
+        self.rng.shuffle(cards)
         return cards
 
     def draw_face_up_cards(self, num_cards: int):
         """Draw cards to the face-up display."""
         while len(self.face_up_cards) < num_cards and self.train_deck:
-            self.face_up_cards.append(self.train_deck.pop())
+            card = self._pop_deck()
+            keys = self.zobrist.face_up[COLOR_INDEX[card]]
+            count = self.face_up_cards.count(card)
+            self.hash ^= keys[count] ^ keys[count + 1]
+            self.face_up_cards.append(card)
+
+    def _pop_deck(self) -> CardColor:
+        """Take the top card of the deck, keeping the hash up to date."""
+        size = len(self.train_deck)
+        self.hash ^= self.zobrist.deck[size] ^ self.zobrist.deck[size - 1]
+        return self.train_deck.pop()
 
     def draw_train_card(self, player_id: int, face_up_index: Optional[int] = None) -> Optional[CardColor]:
         """Draw a train card, either from face-up cards or the deck."""
         if face_up_index is not None and 0 <= face_up_index < len(self.face_up_cards):
             card = self.face_up_cards.pop(face_up_index)
-            self.draw_face_up_cards(5)  # Replenish face-up cards
+            keys = self.zobrist.face_up[COLOR_INDEX[card]]
+            count = self.face_up_cards.count(card)
+            self.hash ^= keys[count + 1] ^ keys[count]
+            self.draw_face_up_cards(FACE_UP_CARDS)  # Replenish face-up cards
         elif self.train_deck:
-            card = self.train_deck.pop()
+            card = self._pop_deck()
+            face_up_index = None
         else:
             return None
 
-        self.players[player_id]["hand"].append(card)
+        hand = self.players[player_id]["hand"]
+        color_index = COLOR_INDEX[card]
+        keys = self.zobrist.hand[player_id][color_index]
+        self.hash ^= keys[hand.counts[color_index]] ^ keys[hand.counts[color_index] + 1]
+        hand.add(card)
+        self.legal_moves.refresh(player_id)
+        if self.event_log is not None:
+            self.event_log.draw_card(player_id, face_up_index)
         return card
 
     def initial_ticket_selection(self, player_id: int):
-        # Give 5 destination tickets to the player
-        tickets = self.map.draw_destination_tickets(5)
-        # AI chooses 3 tickets to keep
-        kept_tickets = self.players[player_id]['ai_agent'].choose_tickets_to_keep(tickets, min_keep=3)
-        self.players[player_id]["destination_tickets"].extend(kept_tickets)
-        # Return unkept tickets to the pool
-        for ticket in tickets:
-            if ticket not in kept_tickets:
-                self.map.return_destination_ticket(ticket)
+        # Give 5 destination tickets to the player, the AI chooses 3 to keep
+        self._offer_tickets(player_id, INITIAL_TICKETS, INITIAL_TICKETS_KEPT)
 
     def draw_destination_tickets(self, player_id: int):
-        # Player draws 3 new tickets
-        tickets = self.map.draw_destination_tickets(3)
-        # AI chooses at least 1 ticket to keep
-        kept_tickets = self.players[player_id]['ai_agent'].choose_tickets_to_keep(tickets, min_keep=1)
+        # Player draws 3 new tickets, the AI chooses at least 1 to keep
+        self._offer_tickets(player_id, DRAWN_TICKETS, DRAWN_TICKETS_KEPT)
+
+    def _offer_tickets(self, player_id: int, num_tickets: int, min_keep: int):
+        tickets = self.map.draw_destination_tickets(num_tickets, self.rng)
+        agent = self.players[player_id]['ai_agent']
+        if self.move_timer is None:
+            kept_tickets = agent.choose_tickets_to_keep(tickets, min_keep=min_keep)
+        else:
+            deadline = self.move_timer.start(agent)
+            kept_tickets = agent.choose_tickets_to_keep(tickets, min_keep=min_keep)
+            if not self.move_timer.finish(agent, deadline, player_id):
+                kept_tickets = tickets[:min_keep]  # Too slow: keep the first tickets offered
+        self.keep_tickets(player_id, tickets, kept_tickets)
+
+    def keep_tickets(self, player_id: int, tickets: List[DestinationTicket], kept_tickets: List[DestinationTicket]):
+        """Give a player the tickets they kept out of those offered, and return the rest to the pool."""
         self.players[player_id]["destination_tickets"].extend(kept_tickets)
+        for ticket in kept_tickets:
+            self.hash ^= self.zobrist.ticket[player_id][self.map.destination_tickets.index(ticket)]
         # Return unkept tickets to the pool
         for ticket in tickets:
             if ticket not in kept_tickets:
                 self.map.return_destination_ticket(ticket)
+        if self.event_log is not None:
+            self.event_log.keep_tickets(player_id,
+                                        [self.map.destination_tickets.index(ticket) for ticket in tickets],
+                                        [tickets.index(ticket) for ticket in kept_tickets])
+
+    def claim_route(self, player_id: int, route: Route, cards: Optional[Sequence[CardColor]] = None) -> bool:
+        """
+        Claim a route for a player, paying for it with the given cards (by default the ones
+        Hand.spend picks) and updating their score and trains. Returns False, changing nothing,
+        if the route is claimed, longer than the player's remaining trains or not paid for.
+        """
+        player = self.players[player_id]
+        if route.length > player["remaining_trains"]:
+            return False
+        # Only claims paid differently from the default need their cards in the event log
+        default_payment = (player["hand"].payment(route)
+                           if cards is not None and self.event_log is not None else None)
+        counts = player["hand"].counts[:]
+        if not self.map.claim_route(route, player_id, player["hand"], cards):
+            return False
 
-    def check_end_game_condition(self, current_player: int):
-        """Check if any player has 3 or fewer trains remaining."""
+        hand_keys = self.zobrist.hand[player_id]
+        for color_index, (before, after) in enumerate(zip(counts, player["hand"].counts)):
+            if before != after:
+                self.hash ^= hand_keys[color_index][before] ^ hand_keys[color_index][after]
+        self.hash ^= self.zobrist.route_owner[self.map.route_index[route]][player_id]
+        self.legal_moves.refresh(player_id)
+        player["points"] += self.map.calculate_route_points(route)
+        player["claimed_routes"].append(route)
+        player["remaining_trains"] -= route.length
+        if self.event_log is not None:
+            card_indices = None
+            if default_payment is not None and (sorted(cards, key=COLOR_INDEX.get) !=
+                                                sorted(default_payment, key=COLOR_INDEX.get)):
+                card_indices = [COLOR_INDEX[card] for card in cards]
+            self.event_log.claim_route(player_id, self.map.route_index[route], card_indices)
+        return True
+
+    def log_keyframe(self):
+        """Store the full game state in the event log, if one is recording and a keyframe is due."""
+        if self.event_log is not None and self.event_log.keyframe_due:
+            self.event_log.keyframe(self.snapshot().encode(self.map))
+
+    def ticket_outcomes(self, player_id: int) -> List[Tuple[DestinationTicket, bool]]:
+        """Return each of a player's destination tickets with whether it is completed."""
+        tickets = self.players[player_id]["destination_tickets"]
+        return list(zip(tickets, self.map.are_tickets_completed(player_id, tickets)))
+
+    def final_score(self, player_id: int) -> int:
+        """Route points plus completed tickets, minus tickets that were not completed."""
+        score = self.players[player_id]["points"]
+        for ticket, completed in self.ticket_outcomes(player_id):
+            score += ticket.points if completed else -ticket.points
+        return score
+
+    def check_end_game_condition(self, current_player: int) -> bool:
+        """
+        Check if any player has 3 or fewer trains remaining.
+        Returns True if this check started the final round.
+        """
         if not self.final_round:
             remaining_trains = self.players[current_player]["remaining_trains"]
-            if remaining_trains <= 3:
+            if remaining_trains <= FINAL_ROUND_TRAINS:
                 self.final_round = True
                 self.last_turn_player = current_player
-                print(f"Player {current_player} has {remaining_trains} trains remaining. Final round begins!")
+                return True
+        return False
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        Capture route ownership, hands, deck order, tickets and counters.
+        Static map topology is not copied, and neither is the random number generator.
+        """
+        route_index = self.map.route_index
+        return GameSnapshot(
+            route_owners=self.map.get_route_owners(),
+            players=tuple(
+                (tuple(player["hand"].counts),
+                 tuple(route_index[route] for route in player["claimed_routes"]),
+                 tuple(player["destination_tickets"]),
+                 player["remaining_trains"],
+                 player["points"])
+                for player in self.players.values()
+            ),
+            train_deck=tuple(self.train_deck),
+            face_up_cards=tuple(self.face_up_cards),
+            drawn_tickets=tuple(self.map.drawn_tickets),
+            turn_number=self.turn_number,
+            current_player=self.current_player,
+            final_round=self.final_round,
+            last_turn_player=self.last_turn_player
+        )
+
+    def restore(self, snapshot: GameSnapshot):
+        """
+        Return to a snapshot taken from this game or from a clone of it.
+        Player dicts and card lists are updated in place so agents keep valid references.
+        """
+        self.map.set_route_owners(snapshot.route_owners)
+        self.map.drawn_tickets[:] = snapshot.drawn_tickets
+        routes = self.map.routes
+        for player, (counts, claimed, tickets, trains, points) in zip(self.players.values(), snapshot.players):
+            player["hand"].set_counts(counts)
+            player["claimed_routes"][:] = [routes[i] for i in claimed]
+            player["destination_tickets"][:] = tickets
+            player["remaining_trains"] = trains
+            player["points"] = points
+        self.train_deck[:] = snapshot.train_deck
+        self.face_up_cards[:] = snapshot.face_up_cards
+        self.turn_number = snapshot.turn_number
+        self.current_player = snapshot.current_player
+        self.final_round = snapshot.final_round
+        self.last_turn_player = snapshot.last_turn_player
+        self.legal_moves.refresh_all()
+        self.hash = self.zobrist.position_hash(self)
+
+    def clone(self, rng: Optional[random.Random] = None) -> "GameState":
+        """
+        Independent copy of this game on a fork of the map, for playing out hypothetical moves.
+        The clone uses rng if given, otherwise a copy of this game's generator. Agents, the event
+        log and the move timer are not copied.
+        """
+        clone = GameState.__new__(GameState)
+        clone.map = self.map.fork()  # Also copies the dealt tickets, which snapshot reads from the map too
+        if rng is None:
+            rng = random.Random(0)
+            rng.setstate(self.rng.getstate())
+        clone.rng = rng
+        routes = clone.map.routes
+        route_index = self.map.route_index
+        clone.players = {
+            player_id: {
+                "player_id": player_id,
+                "hand": player["hand"].copy(),
+                "claimed_routes": [routes[route_index[route]] for route in player["claimed_routes"]],
+                "destination_tickets": list(player["destination_tickets"]),
+                "remaining_trains": player["remaining_trains"],
+                "points": player["points"]
+            }
+            for player_id, player in self.players.items()
+        }
+        clone.train_deck = list(self.train_deck)
+        clone.face_up_cards = list(self.face_up_cards)
+        clone.turn_number = self.turn_number
+        clone.current_player = self.current_player
+        clone.final_round = self.final_round
+        clone.last_turn_player = self.last_turn_player
+        clone.event_log = None
+        clone.move_timer = None
+        clone.zobrist = self.zobrist
+        clone.hash = self.hash
+        clone._link_players()
+        return clone
@@ -0,0 +1,191 @@
+import math
+import os
+from collections import Counter
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from game.agent import TicketToRideAI
+from game.simulation import GameResult, simulate_game
+
+
+@dataclass
+class ScoreStats:
+    """Running win and score statistics for one agent or one seat."""
+    games: int = 0
+    wins: int = 0
+    ties: int = 0
+    total: float = 0.0
+    total_squared: float = 0.0
+    distribution: Counter = field(default_factory=Counter)  # Final score -> number of games
+
+    def add(self, score: int, won: bool, tied: bool):
+        self.games += 1
+        self.wins += won
+        self.ties += tied
+        self.total += score
+        self.total_squared += score * score
+        self.distribution[score] += 1
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+    @property
+    def mean_score(self) -> float:
+        return self.total / self.games if self.games else 0.0
+
+    @property
+    def score_stdev(self) -> float:
+        if self.games < 2:
+            return 0.0
+        variance = (self.total_squared - self.total * self.total / self.games) / (self.games - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def win_rate_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        """Wilson score interval for the win rate (95% by default)."""
+        if not self.games:
+            return 0.0, 1.0
+        n = self.games
+        p = self.win_rate
+        denominator = 1 + z * z / n
+        centre = (p + z * z / (2 * n)) / denominator
+        margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+        return max(0.0, centre - margin), min(1.0, centre + margin)
+
+    def mean_score_interval(self, z: float = 1.96) -> Tuple[float, float]:
+        """Normal approximation interval for the mean score (95% by default)."""
+        margin = z * self.score_stdev / math.sqrt(self.games) if self.games else 0.0
+        return self.mean_score - margin, self.mean_score + margin
+
+    def summary(self) -> dict:
+        return {
+            "games": self.games,
+            "wins": self.wins,
+            "ties": self.ties,
+            "win_rate": self.win_rate,
+            "win_rate_ci": self.win_rate_interval(),
+            "mean_score": self.mean_score,
+            "mean_score_ci": self.mean_score_interval(),
+            "score_stdev": self.score_stdev,
+            "min_score": min(self.distribution) if self.distribution else None,
+            "max_score": max(self.distribution) if self.distribution else None,
+        }
+
+
+@dataclass
+class TournamentStats:
+    """Aggregated results of a tournament, broken down per agent and per seat."""
+    games: int = 0
+    by_agent: Dict[str, ScoreStats] = field(default_factory=dict)
+    by_seat: Dict[int, ScoreStats] = field(default_factory=dict)
+
+    def add(self, seating: Tuple[str, ...], result: GameResult):
+        """Add a finished game, where seating[i] is the name of the agent in seat i."""
+        self.games += 1
+        for seat, name in enumerate(seating):
+            score = result.scores[seat]
+            won = result.winner == seat
+            tied = result.winner is None and score == max(result.scores.values())
+            self.by_agent.setdefault(name, ScoreStats()).add(score, won, tied)
+            self.by_seat.setdefault(seat, ScoreStats()).add(score, won, tied)
+
+    def summary(self) -> dict:
+        return {
+            "games": self.games,
+            "agents": {name: stats.summary() for name, stats in self.by_agent.items()},
+            "seats": {seat: stats.summary() for seat, stats in self.by_seat.items()},
+        }
+
+
+def _play_seeded_game(task) -> Tuple[Tuple[str, ...], GameResult]:
+    """Worker entry point: play one game for a (seed, seating, factories, max_turns, move_time_ms) task."""
+    seed, seating, factories, max_turns, move_time_ms = task
+    return seating, simulate_game(seed, agents=factories, max_turns=max_turns, move_time_ms=move_time_ms)
+
+
+def _play_seeded_games(tasks) -> List[Tuple[Tuple[str, ...], GameResult]]:
+    """Worker entry point: play a chunk of games, see _play_seeded_game."""
+    return [_play_seeded_game(task) for task in tasks]
+
+
+def _game_tasks(agents: Dict[str, Callable], num_games: int, base_seed: int, max_turns: int,
+                move_time_ms: Optional[float]):
+    """
+    Generate one task per game. Consecutive games replay the same seed with the seats rotated,
+    so every agent plays every seat of every deal.
+    """
+    names = list(agents)
+    for game_index in range(num_games):
+        deal, rotation = divmod(game_index, len(names))
+        seating = tuple(names[rotation:] + names[:rotation])
+        factories = [agents[name] for name in seating]
+        yield base_seed + deal, seating, factories, max_turns, move_time_ms
+
+
+def iter_tournament(agents: Dict[str, Callable], num_games: int, base_seed: int = 0,
+                    workers: Optional[int] = None, max_turns: int = 80, chunksize: int = 16,
+                    move_time_ms: Optional[float] = None) -> Iterator[Tuple[Tuple[str, ...], GameResult]]:
+    """
+    Play num_games games between the given agents and yield (seating, result) as games finish. With
+    worker processes, games come back a chunk at a time in the order the chunks finish, not the order
+    the games were scheduled in.
+
+    Args:
+        agents: Agent name -> agent factory. Factories must be picklable (e.g. module-level classes).
+        num_games: Number of games to play
+        base_seed: Seed of the first deal; deals use consecutive seeds so every game can be reproduced
+        workers: Number of worker processes, defaults to one per CPU. 1 runs games in this process.
+        max_turns: Maximum number of turns per game
+        chunksize: Number of games sent to a worker at a time
+        move_time_ms: Time budget of every decision, see game.deadlines; None for no limit. Only agents that
+            honour the deadline are bounded by it; late decisions are replaced once they return.
+    """
+    tasks = _game_tasks(agents, num_games, base_seed, max_turns, move_time_ms)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(_play_seeded_game, tasks)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_play_seeded_games, chunk)
+                   for chunk in iter(lambda: list(itertools.islice(tasks, chunksize)), [])]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def run_tournament(agents: Dict[str, Callable], num_games: int, base_seed: int = 0,
+                   workers: Optional[int] = None, max_turns: int = 80,
+                   progress: Optional[Callable[[TournamentStats], None]] = None,
+                   move_time_ms: Optional[float] = None) -> TournamentStats:
+    """
+    Play a tournament and return the aggregated statistics.
+    If given, progress is called with the running statistics after every game.
+    """
+    stats = TournamentStats()
+    for seating, result in iter_tournament(agents, num_games, base_seed, workers, max_turns,
+                                           move_time_ms=move_time_ms):
+        stats.add(seating, result)
+        if progress:
+            progress(stats)
+    return stats
+
+
+def print_tournament_summary(stats: TournamentStats):
+    print(f"\nTournament results over {stats.games} games:")
+    print("=" * 40)
+    for title, groups in (("Agent", stats.by_agent), ("Seat", stats.by_seat)):
+        for key, group in groups.items():
+            low, high = group.win_rate_interval()
+            score_low, score_high = group.mean_score_interval()
+            print(f"{title} {key}:")
+            print(f"  Win rate: {group.win_rate:.1%} (95% CI {low:.1%} - {high:.1%}), ties: {group.ties}")
+            print(f"  Mean score: {group.mean_score:.1f} (95% CI {score_low:.1f} - {score_high:.1f}), "
+                  f"stdev {group.score_stdev:.1f}")
+    print("=" * 40)
+
+
+if __name__ == "__main__":
+    tournament_stats = run_tournament({"ai_a": TicketToRideAI, "ai_b": TicketToRideAI}, num_games=200)
+    print_tournament_summary(tournament_stats)
@@ -29,7 +29,7 @@ class City:
     y: int  # y-coordinate for visualization
 
 
-@dataclass
+@dataclass(eq=False)  # Compare by identity so parallel routes stay distinct and routes can be indexed
 class Route:
     city1: str
     city2: str
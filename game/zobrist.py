@@ -0,0 +1,121 @@
+"""
+Zobrist hashing of game positions, and a transposition table keyed by the hashes.
+
+A position's hash is the XOR of one random 64-bit key per feature: the owner of each claimed route, the
+number of cards of each color in each player's hand, the tickets each player holds, the number of
+cards of each color on display and the number of cards left in the deck. The order of the deck (hidden
+from everyone) and of the display are left out, so positions reached by draws in a different order hash
+the same. GameState keeps its hash up to date with a few XORs per draw, payment, claim and kept ticket.
+"""
+import random
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from game.hand import CARD_COLORS
+
+ZOBRIST_SEED = 0x7A0B  # Fixed, so every process derives the same keys and hashes can be compared between them
+MASK_64 = (1 << 64) - 1
+DEFAULT_TABLE_SIZE = 1 << 16
+
+
+class ZobristKeys:
+    """Random keys for every feature of a position; counts of zero are keyed 0 so that empty hands add nothing."""
+
+    def __init__(self, num_routes: int, num_tickets: int, num_players: int, max_count: int, deck_size: int,
+                 seed: int = ZOBRIST_SEED):
+        rng = random.Random(seed)
+
+        def keys(count: int) -> List[int]:
+            return [rng.getrandbits(64) for _ in range(count)]
+
+        self.route_owner = [keys(num_players) for _ in range(num_routes)]  # [route][player]
+        self.hand = [[[0] + keys(max_count) for _ in CARD_COLORS] for _ in range(num_players)]  # [player][color][count]
+        self.ticket = [keys(num_tickets) for _ in range(num_players)]  # [player][ticket index]
+        self.face_up = [[0] + keys(max_count) for _ in CARD_COLORS]  # [color][count]
+        self.deck = [0] + keys(deck_size)  # [cards left]
+
+    def position_hash(self, game) -> int:
+        """Hash of a GameState computed from scratch, which the game's incremental hash always equals."""
+        game_map = game.map
+        value = self.deck[len(game.train_deck)]
+        for index, route in enumerate(game_map.routes):
+            if route.claimed_by is not None:
+                value ^= self.route_owner[index][route.claimed_by]
+        for player_id, player in game.players.items():
+            for color_index, count in enumerate(player["hand"].counts):
+                value ^= self.hand[player_id][color_index][count]
+            for ticket in player["destination_tickets"]:
+                value ^= self.ticket[player_id][game_map.destination_tickets.index(ticket)]
+        for color_index, color in enumerate(CARD_COLORS):
+            value ^= self.face_up[color_index][game.face_up_cards.count(color)]
+        return value
+
+
+@lru_cache(maxsize=None)
+def zobrist_keys(num_routes: int, num_tickets: int, num_players: int, max_count: int,
+                 deck_size: int) -> ZobristKeys:
+    """The shared keys for games of this size."""
+    return ZobristKeys(num_routes, num_tickets, num_players, max_count, deck_size)
+
+
+def combine(position_hash: int, value: int) -> int:
+    """Mix an integer, e.g. a seed or the player to move, into a hash to key variants of a position."""
+    return (position_hash ^ (value * 0x9E3779B97F4A7C15)) & MASK_64
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of values keyed by 64-bit hashes.
+
+    A key can live in either slot of a two-slot bucket picked by its low bits. Storing a key that is
+    already there overwrites it; otherwise the key takes an empty slot or replaces the entry worth less:
+    one stored before the latest new_search, and among entries of the same search the one with the
+    lower depth, i.e. the one that took less work to compute.
+    """
+
+    def __init__(self, size: int = DEFAULT_TABLE_SIZE):
+        buckets = 1
+        while buckets * 2 < size:
+            buckets *= 2
+        self._mask = buckets - 1
+        self._slots: List[Optional[Tuple[int, object, int, int]]] = [None] * (buckets * 2)  # (key, value, depth, generation)
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.replacements = 0
+
+    def __len__(self) -> int:
+        return sum(slot is not None for slot in self._slots)
+
+    def new_search(self):
+        """Start a new generation, so entries from earlier searches are replaced first."""
+        self.generation += 1
+
+    def clear(self):
+        self._slots = [None] * len(self._slots)
+
+    def get(self, key: int) -> Optional[object]:
+        """The value stored under the key, or None."""
+        slot = (key & self._mask) * 2
+        for entry in self._slots[slot:slot + 2]:
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        return None
+
+    def store(self, key: int, value, depth: int = 0):
+        slot = (key & self._mask) * 2
+        slots = self._slots
+        first, second = slots[slot], slots[slot + 1]
+        if second is not None and second[0] == key:
+            target = slot + 1
+        elif first is None or first[0] == key:
+            target = slot
+        elif second is None:
+            target = slot + 1
+        else:
+            # Both taken by other keys: replace the older generation, then the shallower entry
+            target = slot if (first[3], first[2]) <= (second[3], second[2]) else slot + 1
+            self.replacements += 1
+        slots[target] = (key, value, depth, self.generation)
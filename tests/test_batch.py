@@ -0,0 +1,47 @@
+import numpy as np
+
+from game.batch import DRAW_CARDS, BatchGame
+from game.state import FACE_UP_CARDS, STARTING_CARDS, TRAIN_DECK_DISTRIBUTION
+
+
+def draw_only(batch: BatchGame) -> np.ndarray:
+    return np.full(batch.num_games, DRAW_CARDS)
+
+
+def test_game_ends_when_the_deck_runs_out():
+    num_players = 2
+    batch = BatchGame(num_games=8, num_players=num_players, seed=0, max_turns=1000)
+    deck_after_deal = sum(TRAIN_DECK_DISTRIBUTION.values()) - FACE_UP_CARDS - num_players * STARTING_CARDS
+    assert (batch.deck_size == deck_after_deal).all()
+
+    # Two cards a turn: every game is still going until the turn that takes the last card
+    for _ in range((deck_after_deal + 1) // 2 - 1):
+        batch.step(draw_only(batch))
+        assert not batch.done.any()
+    batch.step(draw_only(batch))
+
+    assert batch.done.all()
+    assert (batch.deck_size == 0).all()
+    assert (batch.hands.sum(axis=(1, 2)) == deck_after_deal + num_players * STARTING_CARDS).all()
+
+
+def test_finished_games_are_not_advanced():
+    batch = BatchGame(num_games=4, seed=1, max_turns=1000)
+    batch.play([draw_only, draw_only])
+    turns = batch.turn_number.copy()
+    batch.step(draw_only(batch))
+    assert (batch.turn_number == turns).all()
+
+
+def test_claims_need_enough_trains():
+    batch = BatchGame(num_games=2, seed=2, max_turns=1000)
+    batch.hands[:] = 6  # Every route is affordable
+    batch.trains[:, 0] = 2
+    claimable = batch.claimable_mask()
+    assert claimable.any(axis=1).all()
+    assert (np.broadcast_to(batch.route_lengths, claimable.shape)[claimable] <= 2).all()
+
+    longest = int(batch.route_lengths.argmax())
+    batch.step(np.full(batch.num_games, longest))
+    assert (batch.owner[:, longest] == -1).all()
+    assert (batch.trains[:, 0] == 2).all()
@@ -0,0 +1,36 @@
+import random
+
+from game.hand import CARD_COLORS
+from game.map import TicketToRideMap
+from game.state import GameState
+
+
+def test_claimable_routes_respect_remaining_trains():
+    game = GameState(TicketToRideMap(), 2, rng=random.Random(0))
+    player = game.players[0]
+    player["hand"].set_counts([6] * len(CARD_COLORS))  # Affords every route on the map
+    game.legal_moves.refresh(0)
+    assert any(route.length > 3 for route in game.claimable_routes(0))
+
+    player["remaining_trains"] = 3
+    routes = game.claimable_routes(0)
+    assert routes and all(route.length <= 3 for route in routes)
+    assert routes == [route for route in game.map.routes if route.length <= 3]
+
+    player["remaining_trains"] = 0
+    assert game.claimable_routes(0) == []
+    assert game.legal_moves.first(0) is None
+
+
+def test_claimable_routes_match_a_full_scan():
+    game = GameState(TicketToRideMap(), 2, rng=random.Random(1))
+    rng = random.Random(2)
+    for _ in range(200):
+        player_id = rng.randrange(2)
+        player = game.players[player_id]
+        player["hand"].set_counts([rng.randrange(4) for _ in CARD_COLORS])
+        game.legal_moves.refresh(player_id)
+        player["remaining_trains"] = rng.randrange(8)
+        expected = [route for route in game.map.unclaimed_routes
+                    if route.length <= player["remaining_trains"] and player["hand"].can_afford(route)]
+        assert game.claimable_routes(player_id) == expected
@@ -0,0 +1,39 @@
+import random
+
+from game.actions import ClaimRoute
+from game.hand import CARD_COLORS, WILD_INDEX
+from game.map import TicketToRideMap
+from game.simulation import apply_action
+from game.state import GameState
+
+
+def game_with_long_route_and_few_trains():
+    game = GameState(TicketToRideMap(), 2, rng=random.Random(0))
+    route = next(route for route in game.map.routes if route.length >= 4)
+    player = game.players[0]
+    counts = [0] * len(CARD_COLORS)
+    counts[WILD_INDEX] = route.length  # Wilds pay for a route of any color
+    player["hand"].set_counts(counts)
+    game.legal_moves.refresh(0)
+    player["remaining_trains"] = route.length - 1
+    return game, route
+
+
+def test_claim_longer_than_remaining_trains_is_rejected():
+    game, route = game_with_long_route_and_few_trains()
+    player = game.players[0]
+    counts, position_hash = player["hand"].counts[:], game.hash
+
+    assert not game.claim_route(0, route)
+    assert route.claimed_by is None
+    assert player["hand"].counts == counts
+    assert player["remaining_trains"] == route.length - 1
+    assert player["points"] == 0
+    assert game.hash == position_hash
+
+
+def test_apply_action_treats_claim_without_trains_as_illegal():
+    game, route = game_with_long_route_and_few_trains()
+    action = ClaimRoute(route, tuple(game.players[0]["hand"].payment(route)))
+    assert not apply_action(game, 0, action)
+    assert route.claimed_by is None